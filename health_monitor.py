@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import os, json, time, socket, threading, requests
+import http_client
+
+HEALTH_STATE_FILE = ".health_state.json"
+INTERNET_CHECK_INTERVAL = 30
+AUTH_CHECK_INTERVAL = 300
+FAILURE_RETRY_INTERVAL = 10
+STATE_MAX_AGE = 120
+
+def check_internet_connection(timeout=5):
+    try:
+        response = http_client.get("http://www.google.com", timeout=timeout, retries=0)
+        return response.status_code == 200
+    except requests.RequestException:
+        try:
+            socket.create_connection(("8.8.8.8", 53), timeout=timeout).close()
+            return True
+        except OSError:
+            return False
+
+def check_spotify_auth(timeout=5):
+    try:
+        from spotify_auth_manager import get_spotify_client
+        sp = get_spotify_client(timeout=timeout)
+        if not sp:
+            return False, "Could not get Spotify client"
+        user = sp.current_user()
+        return True, f"Authenticated as {user.get('display_name', 'Unknown User')}"
+    except Exception as e:
+        return False, f"Authentication error: {str(e)}"
+
+def read_health_state(path=HEALTH_STATE_FILE, max_age=STATE_MAX_AGE):
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - state.get('internet_checked_at', 0) > max_age:
+        return None
+    return state
+
+class HealthMonitor:
+    def __init__(self, state_file=HEALTH_STATE_FILE, check_auth=True, on_change=None, logger=None):
+        self.state_file = state_file
+        self.check_auth = check_auth
+        self.on_change = on_change
+        self.logger = logger
+        self._state = {
+            'internet': None,
+            'internet_checked_at': 0,
+            'spotify_authenticated': None,
+            'spotify_message': "Checking...",
+            'auth_checked_at': 0
+        }
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._probing = False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        http_client.add_failure_listener(self._on_request_failure)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def request_check(self, auth=False):
+        with self._lock:
+            self._state['internet_checked_at'] = 0
+            if auth:
+                self._state['auth_checked_at'] = 0
+        self._wake.set()
+
+    def _on_request_failure(self, host, error):
+        with self._lock:
+            if self._probing:
+                return
+            recently_checked = time.time() - self._state['internet_checked_at'] < FAILURE_RETRY_INTERVAL
+        if not recently_checked:
+            self.request_check()
+
+    def get_status(self):
+        with self._lock:
+            return dict(self._state)
+
+    def is_online(self):
+        with self._lock:
+            return self._state['internet'] is not False
+
+    def spotify_auth(self):
+        with self._lock:
+            return bool(self._state['spotify_authenticated']), self._state['spotify_message']
+
+    def _next_delay(self):
+        with self._lock:
+            state = dict(self._state)
+        now = time.time()
+        internet_interval = INTERNET_CHECK_INTERVAL if state['internet'] else FAILURE_RETRY_INTERVAL
+        delays = [state['internet_checked_at'] + internet_interval - now]
+        if self.check_auth:
+            auth_interval = AUTH_CHECK_INTERVAL if state['spotify_authenticated'] else FAILURE_RETRY_INTERVAL * 3
+            delays.append(state['auth_checked_at'] + auth_interval - now)
+        return max(0, min(delays))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._probing = True
+            try:
+                self._probe()
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Health monitor error: {e}")
+            finally:
+                self._probing = False
+            self._ready.set()
+            self._wake.wait(max(1, self._next_delay()))
+            self._wake.clear()
+
+    def _probe(self):
+        now = time.time()
+        with self._lock:
+            state = dict(self._state)
+        updates = {}
+        internet_interval = INTERNET_CHECK_INTERVAL if state['internet'] else FAILURE_RETRY_INTERVAL
+        if now - state['internet_checked_at'] >= internet_interval:
+            updates['internet'] = check_internet_connection(timeout=3)
+            updates['internet_checked_at'] = time.time()
+        online = updates.get('internet', state['internet'])
+        if self.check_auth:
+            auth_interval = AUTH_CHECK_INTERVAL if state['spotify_authenticated'] else FAILURE_RETRY_INTERVAL * 3
+            if online and now - state['auth_checked_at'] >= auth_interval:
+                authenticated, message = check_spotify_auth(timeout=5)
+                updates.update(spotify_authenticated=authenticated, spotify_message=message, auth_checked_at=time.time())
+            elif not online and state['spotify_authenticated'] is None:
+                updates.update(spotify_authenticated=False, spotify_message="No internet connection")
+        if not updates:
+            return
+        with self._lock:
+            changed = any(self._state.get(key) != value for key, value in updates.items() if not key.endswith('_checked_at'))
+            self._state.update(updates)
+            snapshot = dict(self._state)
+        self._write_state(snapshot)
+        if changed:
+            if self.logger is not None:
+                self.logger.info(f"Health: internet={'up' if snapshot['internet'] else 'down'}, spotify={snapshot['spotify_message']}")
+            if self.on_change is not None:
+                self.on_change(snapshot)
+
+    def _write_state(self, state):
+        temp_path = f"{self.state_file}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_file)
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.warning(f"Could not write {self.state_file}: {e}")
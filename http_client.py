@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import time, random, threading, requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_sessions = {}
+_session_lock = threading.Lock()
+_host_stats = {}
+_stats_lock = threading.Lock()
+_failure_listeners = []
+
+def _empty_host_stats():
+    return {
+        'requests': 0,
+        'errors': 0,
+        'retries': 0,
+        'total_latency': 0.0,
+        'max_latency': 0.0,
+        'last_status': None
+    }
+
+def _host_entry(host):
+    entry = _host_stats.get(host)
+    if entry is None:
+        entry = _host_stats[host] = _empty_host_stats()
+    return entry
+
+def _record_response(response, *args, **kwargs):
+    host = urlsplit(response.url).hostname or ''
+    latency = response.elapsed.total_seconds()
+    with _stats_lock:
+        entry = _host_entry(host)
+        entry['requests'] += 1
+        entry['total_latency'] += latency
+        entry['max_latency'] = max(entry['max_latency'], latency)
+        entry['last_status'] = response.status_code
+        if response.status_code >= 500:
+            entry['errors'] += 1
+
+def _record_event(host, key):
+    with _stats_lock:
+        _host_entry(host)[key] += 1
+
+def add_failure_listener(callback):
+    _failure_listeners.append(callback)
+
+def _notify_failure(host, error):
+    for callback in list(_failure_listeners):
+        try:
+            callback(host, error)
+        except Exception:
+            pass
+
+def get_session(name='default', max_retries=0, pool_maxsize=8):
+    with _session_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize, max_retries=max_retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.hooks['response'].append(_record_response)
+            _sessions[name] = session
+        return session
+
+def _backoff_delay(attempt):
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _retry_after_delay(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, retries=None, **kwargs):
+    method = method.upper()
+    if retries is None:
+        retries = DEFAULT_RETRIES if method in IDEMPOTENT_METHODS else 0
+    host = urlsplit(url).hostname or ''
+    session = get_session()
+    attempt = 0
+    while True:
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _record_event(host, 'errors')
+            if attempt >= retries:
+                _notify_failure(host, e)
+                raise
+            delay = _backoff_delay(attempt)
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = _retry_after_delay(response)
+            if delay is None:
+                delay = _backoff_delay(attempt)
+            elif delay > BACKOFF_MAX:
+                return response
+            response.close()
+        attempt += 1
+        _record_event(host, 'retries')
+        time.sleep(delay)
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
+
+def _pool_counters():
+    counters = {}
+    with _session_lock:
+        sessions = list(_sessions.values())
+    adapters = {}
+    for session in sessions:
+        for adapter in session.adapters.values():
+            adapters[id(adapter)] = adapter
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            entry = counters.setdefault(pool.host, {'connections_opened': 0, 'connections_reused': 0})
+            entry['connections_opened'] += pool.num_connections
+            entry['connections_reused'] += max(0, pool.num_requests - pool.num_connections)
+    return counters
+
+def get_stats():
+    with _stats_lock:
+        stats = {host: dict(entry) for host, entry in _host_stats.items()}
+    for host, counters in _pool_counters().items():
+        stats.setdefault(host, _empty_host_stats()).update(counters)
+    for entry in stats.values():
+        total_latency = entry.pop('total_latency')
+        entry['avg_latency_ms'] = round(total_latency * 1000 / entry['requests'], 1) if entry['requests'] else 0
+        entry['max_latency_ms'] = round(entry.pop('max_latency') * 1000, 1)
+        entry.setdefault('connections_opened', 0)
+        entry.setdefault('connections_reused', 0)
+    return stats
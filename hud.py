@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
-import time, requests, json, evdev, spotipy, colorsys, datetime, os, subprocess, toml, random, sys, copy, math, queue, threading, signal, hashlib, functools, concurrent.futures, numpy as np
+import time, requests, json, evdev, spotipy, colorsys, datetime, os, subprocess, toml, random, sys, copy, math, queue, threading, signal, hashlib, functools, uuid, concurrent.futures, numpy as np
+import http_client, state_bus
+from health_monitor import check_internet_connection, read_health_state
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance, ImageStat, ImageColor
 from threading import Thread, Event, RLock
@@ -73,7 +75,8 @@ DEFAULT_CONFIG = {
         "time_display": True,
         "sleep_timeout": 300,
         "progressbar_display": True,
-        "enable_current_track_display": True
+        "enable_current_track_display": True,
+        "volatile_state_dir": "/dev/shm"
     },
     "wifi": {
         "ap_ssid": "Neonwifi-Manager",
@@ -149,6 +152,11 @@ last_saved_album_art_hash = None
 internet_available = True
 last_internet_check = 0
 last_frame_hash = None
+state_publisher = state_bus.StatePublisher()
+track_state_cache = {'static': None, 'progress': None, 'progress_written_at': 0, 'queue': []}
+last_weather_state = None
+last_weather_written_at = 0
+play_event_state = None
 
 # ============== ANIMATION FUNCTIONS ==============
 
@@ -1294,7 +1302,7 @@ def draw_weather_icon(img, weather_info):
     if "icon_id" in weather_info:
         try:
             icon_url = f"http://openweathermap.org/img/wn/{weather_info['icon_id']}@2x.png"
-            resp = requests.get(icon_url, timeout=5)
+            resp = http_client.get(icon_url, timeout=5)
             resp.raise_for_status()
             icon_img = Image.open(BytesIO(resp.content)).convert("RGBA")
             icon_img.thumbnail((128, 128), Image.BILINEAR)
@@ -1389,19 +1397,12 @@ def wake_up_display():
 
 # ============== INTERNET FUNCTIONS ==============
 
-def check_internet_connection(timeout=5):
-    try:
-        response = requests.get("http://www.google.com", timeout=timeout)
-        return response.status_code == 200
-    except requests.RequestException:
-        try:
-            socket.create_connection(("8.8.8.8", 53), timeout=timeout)
-            return True
-        except:
-            return False
-
 def update_internet_status():
     global internet_available, last_internet_check
+    health_state = read_health_state()
+    if health_state is not None and health_state.get('internet') is not None:
+        internet_available = bool(health_state['internet'])
+        return internet_available
     current_time = time.time()
     if current_time - last_internet_check > INTERNET_CHECK_INTERVAL:
         internet_available = check_internet_connection(timeout=3)
@@ -1451,7 +1452,7 @@ def get_location_via_gpsd(timeout=5, debug=True):
 def get_location_via_google_geolocation(api_key):
     url = f"https://www.googleapis.com/geolocation/v1/geolocate?key={api_key}"
     try:
-        response = requests.post(url, json={}, timeout=15)
+        response = http_client.post(url, json={}, timeout=15)
         response.raise_for_status()
         data = response.json()
         if 'location' in data and 'lat' in data['location'] and 'lng' in data['location']:
@@ -1470,7 +1471,7 @@ def get_location_via_openweathermap_geocoding(api_key, city_name):
     if not city_name: return None, None
     url = f"http://api.openweathermap.org/geo/1.0/direct?q={city_name}&limit=1&appid={api_key}"
     try:
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url, timeout=10)
         response.raise_for_status()
         data = response.json()
         if data and len(data) > 0:
@@ -1598,6 +1599,7 @@ def spotify_loop():
                             'album': current_track_item.get('album', {}).get('name', 'Unknown Album'),
                             'uri': current_track_item.get('uri', ''),
                             'image_url': current_image_url,
+                            'duration': (current_track_item.get('duration_ms') or 0) // 1000,
                             'is_current': True
                         })
                     if queue and 'queue' in queue:
@@ -1613,6 +1615,7 @@ def spotify_loop():
                                 'album': queue_track.get('album', {}).get('name', ''),
                                 'uri': queue_track.get('uri', ''),
                                 'image_url': image_url,
+                                'duration': (queue_track.get('duration_ms') or 0) // 1000,
                                 'is_current': False
                             })
                     last_queue_data = queue_tracks
@@ -1679,7 +1682,9 @@ def weather_loop():
 # ============== CLEANUP FUNCTIONS ==============
 
 def cleanup_album_art():
+    global last_saved_album_art_hash
     try:
+        last_saved_album_art_hash = None
         if os.path.exists('static/current_album_art.jpg'):
             os.remove('static/current_album_art.jpg')
     except Exception as e:
@@ -1774,7 +1779,8 @@ def prepare_track_data(track):
         "volume_percent": volume_percent,
         "device_name": device_name,
         "device_active": device_active,
-        "track_id": item.get('id')
+        "track_id": item.get('id'),
+        "artist_list": artists_list or ["Unknown Artist"]
     }
 
 def prepare_track_state_data(track_data):
@@ -1939,11 +1945,11 @@ def fetch_album_art_with_retry(art_url, max_retries=2):
     for art_attempt in range(max_retries):
         try:
             headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'}
-            resp = requests.get(art_url, headers=headers, timeout=15)
+            resp = http_client.get(art_url, headers=headers, timeout=15, retries=0)
             resp.raise_for_status()
             img = Image.open(BytesIO(resp.content)).convert("RGB")
             img.thumbnail((150, 150), Image.NEAREST)
-            return img
+            return img, resp.content
         except Exception as e:
             if art_attempt < max_retries - 1:
                 wait_time = (art_attempt + 1) * 2
@@ -1951,18 +1957,18 @@ def fetch_album_art_with_retry(art_url, max_retries=2):
                 time.sleep(wait_time)
             else:
                 print(f"Album art fetch failed after {max_retries} attempts: {e}")
-                return None
+                return None, None
 
 def fetch_and_process_album_art(art_url, spotify_track, item, is_continuation):
     global last_art_url, album_art_image
     if not is_continuation:
         try:
             if art_url:
-                img = fetch_album_art_with_retry(art_url)
+                img, art_bytes = fetch_album_art_with_retry(art_url)
                 if img:
                     with art_lock: 
                         album_art_image = img
-                    save_current_album_art(img)
+                    save_current_album_art(art_bytes)
                     request_background_generation(img)
                     album_bg_cache.clear()
                     main_color, secondary_color = get_contrasting_colors(img)
@@ -1974,8 +1980,6 @@ def fetch_and_process_album_art(art_url, spotify_track, item, is_continuation):
                     spotify_track['main_color'] = (0, 255, 0)
                     spotify_track['secondary_color'] = (0, 255, 255)
                 last_art_url = art_url
-                if img:
-                    save_current_album_art(img)
             else:
                 with art_lock: 
                     album_art_image = None
@@ -2037,7 +2041,7 @@ def fetch_and_store_artist_image(artist_id):
                     artist_image = None
                 return
             headers = {'User-Agent': 'Mozilla/5.0'}
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = http_client.get(url, headers=headers, timeout=10, retries=0)
             resp.raise_for_status()
             if 'image' not in resp.headers.get('content-type', '').lower(): 
                 raise ValueError("Not an image")
@@ -2069,6 +2073,7 @@ def get_spotify_colors(spotify_track, album_art_image):
 def handle_no_track_playing(current_time, last_successful_write, write_interval):
     global spotify_track, consecutive_no_track_count
     consecutive_no_track_count += 1
+    track_play_events(None)
     if spotify_track is not None:
         spotify_track = None
         with art_lock: 
@@ -2097,6 +2102,7 @@ def handle_track_update(current_time, last_successful_write, write_interval, tra
     global spotify_track, consecutive_no_track_count, last_art_url
     consecutive_no_track_count = 0
     new_track = prepare_track_data(track)
+    track_play_events(new_track)
     current_track_id = f"{new_track['title']}_{new_track['artists']}"
     is_continuation = (is_first_track_after_startup and previous_track_id and current_track_id == previous_track_id)
     track_changed = track['item'].get('id') != last_track_id or spotify_track is None
@@ -2201,19 +2207,23 @@ def load_previous_track_state():
     except Exception as e:
         pass
 
-def save_current_album_art(album_art_image, track_data=None):
+def save_current_album_art(art_bytes):
     global last_saved_album_art_hash
     try:
         os.makedirs('static', exist_ok=True)
-        if album_art_image is None:
+        if not art_bytes:
             if os.path.exists('static/current_album_art.jpg'):
                 os.remove('static/current_album_art.jpg')
-                last_saved_album_art_hash = None
+            last_saved_album_art_hash = None
+            return
+        art_hash = hashlib.sha1(art_bytes).hexdigest()
+        if art_hash == last_saved_album_art_hash and os.path.exists('static/current_album_art.jpg'):
             return
-        display_size = (300, 300)
-        resized_art = album_art_image.resize(display_size, Image.NEAREST)
-        resized_art.save('static/current_album_art.jpg', 'JPEG', quality=85)
-        last_saved_album_art_hash = hash(album_art_image.tobytes())
+        temp_path = 'static/current_album_art.jpg.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(art_bytes)
+        os.replace(temp_path, 'static/current_album_art.jpg')
+        last_saved_album_art_hash = art_hash
     except Exception as e:
         print(f"Error saving album art for web: {e}")
 
@@ -2274,35 +2284,94 @@ def update_activity():
 
 # ============== TOML FUNCTIONS ==============
 
-def validate_and_write_toml(data, temp_path, final_path):
-    if os.path.exists(temp_path):
-        try:
-            with open(temp_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:
-                    toml.loads(content)
-                    os.replace(temp_path, final_path)
-                    return True
-        except Exception as e:
-            print(f"TOML validation failed: {e}")
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-    return False
+def write_toml_atomic(data, final_path):
+    temp_path = f"{final_path}.tmp"
+    content = toml.dumps(data)
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, final_path)
+
+def split_track_progress(current_track):
+    static_fields = {key: value for key, value in current_track.items() if key not in PROGRESS_FIELDS}
+    progress_fields = {key: current_track.get(key) for key in PROGRESS_FIELDS}
+    return static_fields, progress_fields
+
+def progress_needs_write(progress_fields, now):
+    last_progress = track_state_cache['progress']
+    if last_progress is None or last_progress['is_playing'] != progress_fields['is_playing']:
+        return True
+    if now - track_state_cache['progress_written_at'] >= PROGRESS_WRITE_INTERVAL:
+        return True
+    expected = last_progress['current_position']
+    if last_progress['is_playing']:
+        expected += progress_fields['timestamp'] - last_progress['timestamp']
+    return abs(progress_fields['current_position'] - expected) > PROGRESS_SEEK_TOLERANCE
+
+def emit_play_event(event_type, play, position):
+    event = {
+        'id': f"{play['play_id']}:{event_type}",
+        'play_id': play['play_id'],
+        'type': event_type,
+        'track_id': play['track_id'],
+        'title': play['title'],
+        'artists': play['artists'],
+        'duration': play['duration'],
+        'position': position,
+        'listened_seconds': play['listened_seconds'],
+        'device': play['device'],
+        'started_at': play['started_at'],
+        'ts': time.time()
+    }
+    state_publisher.publish_event('play_event', event)
+
+def finish_play(play):
+    ended = play['duration'] > 0 and play['max_position'] >= play['duration'] - PLAY_END_TOLERANCE
+    emit_play_event('end' if ended else 'skip', play, play['max_position'])
+
+def track_play_events(track_data):
+    global play_event_state
+    play = play_event_state
+    if not track_data or not track_data.get('title'):
+        if play is not None:
+            finish_play(play)
+            play_event_state = None
+        return
+    position = int(track_data.get('current_position', 0))
+    key = (track_data.get('track_id'), track_data.get('title'), track_data.get('artists'))
+    replayed = play is not None and play['key'] == key and position + PLAY_END_TOLERANCE < play['max_position'] \
+        and play['max_position'] >= play['duration'] - PLAY_END_TOLERANCE
+    if play is None or play['key'] != key or replayed:
+        if play is not None:
+            finish_play(play)
+        play = play_event_state = {
+            'play_id': uuid.uuid4().hex,
+            'key': key,
+            'track_id': track_data.get('track_id') or '',
+            'title': track_data.get('title', ''),
+            'artists': track_data.get('artist_list') or [a.strip() for a in str(track_data.get('artists', '')).split(',') if a.strip()],
+            'duration': int(track_data.get('duration', 0)),
+            'device': track_data.get('device_name', ''),
+            'started_at': time.time(),
+            'max_position': position,
+            'listened_seconds': 0,
+            'last_position': position,
+            'threshold_sent': False
+        }
+        emit_play_event('start', play, position)
+    advanced = position - play['last_position']
+    if track_data.get('is_playing') and 0 < advanced <= PLAY_MAX_STEP:
+        play['listened_seconds'] += advanced
+    play['last_position'] = position
+    play['max_position'] = max(play['max_position'], position)
+    if not play['threshold_sent'] and play['duration'] > 0 and position / play['duration'] >= PLAY_THRESHOLD:
+        play['threshold_sent'] = True
+        emit_play_event('threshold', play, position)
 
 def write_current_track_state(track_data, queue_data=None, raw_track_data=None):
     if not ENABLE_CURRENT_TRACK_DISPLAY:
         return
     with file_write_lock:
         try:
-            existing_queue = []
-            if os.path.exists('.current_track_state.toml'):
-                try:
-                    existing_state = toml.load('.current_track_state.toml')
-                    existing_queue = existing_state.get('queue', [])
-                except:
-                    pass
             state_data = {}
             if track_data:
                 volume = track_data.get('volume_percent', 50)
@@ -2352,11 +2421,8 @@ def write_current_track_state(track_data, queue_data=None, raw_track_data=None):
                     'device_name': ''
                 }
             if queue_data is not None:
-                state_data['queue'] = queue_data
-            elif existing_queue:
-                state_data['queue'] = existing_queue
-            else:
-                state_data['queue'] = []
+                track_state_cache['queue'] = queue_data
+            state_data['queue'] = track_state_cache['queue']
             for key in ['current_track', 'device_status']:
                 if key in state_data:
                     for subkey, value in state_data[key].items():
@@ -2364,77 +2430,40 @@ def write_current_track_state(track_data, queue_data=None, raw_track_data=None):
                             state_data[key][subkey] = ""
                         elif isinstance(value, str) and '\n' in value:
                             state_data[key][subkey] = value.replace('\n', ' ')
-            temp_path = '.current_track_state.toml.tmp'
-            final_path = '.current_track_state.toml'
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                toml.dump(state_data, f)
-            if validate_and_write_toml(state_data, temp_path, final_path):
-                return
-            fallback_data = {
-                'current_track': {
-                    'title': 'Error writing state',
-                    'artists': '',
-                    'album': '',
-                    'current_position': 0,
-                    'duration': 0,
-                    'is_playing': False,
-                    'timestamp': time.time(),
-                    'volume_percent': 50
-                },
-                'device_status': {
-                    'has_active_device': False,
-                    'device_name': ''
-                },
-                'queue': existing_queue
+            for key in ('current_track', 'device_status', 'queue'):
+                state_publisher.publish(key, state_data[key])
+            now = time.time()
+            static_fields, progress_fields = split_track_progress(state_data['current_track'])
+            static_state = {
+                'current_track': static_fields,
+                'device_status': state_data['device_status'],
+                'queue': state_data['queue']
             }
-            with open(final_path, 'w', encoding='utf-8') as f:
-                toml.dump(fallback_data, f)
+            static_changed = static_state != track_state_cache['static']
+            if static_changed:
+                write_toml_atomic(state_data, '.current_track_state.toml')
+                track_state_cache['static'] = copy.deepcopy(static_state)
+            if static_changed or progress_needs_write(progress_fields, now):
+                write_toml_atomic({'progress': progress_fields}, PROGRESS_STATE_FILE)
+                track_state_cache['progress'] = progress_fields
+                track_state_cache['progress_written_at'] = now
         except Exception as e:
             print(f"Critical error writing track state: {e}")
-            try:
-                basic_data = {
-                    'current_track': {
-                        'title': 'Write Error',
-                        'artists': '',
-                        'album': '',
-                        'current_position': 0,
-                        'duration': 0,
-                        'is_playing': False,
-                        'timestamp': time.time(),
-                        'volume_percent': 50
-                    },
-                    'device_status': {
-                        'has_active_device': False,
-                        'device_name': ''
-                    },
-                    'queue': existing_queue if 'existing_queue' in locals() else []
-                }
-                with open('.current_track_state.toml', 'w', encoding='utf-8') as f:
-                    toml.dump(basic_data, f)
-            except:
-                pass
+            track_state_cache['static'] = None
 
 def write_weather_state(weather_data):
+    global last_weather_state, last_weather_written_at
     with file_write_lock:
         try:
             state_data = prepare_weather_state_data(weather_data)
-            temp_path = '.weather_state.toml.tmp'
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                toml.dump(state_data, f)
-            if validate_and_write_toml(state_data, temp_path, '.weather_state.toml'):
+            state_publisher.publish('weather', state_data['weather'])
+            comparable = {key: value for key, value in state_data['weather'].items() if key != 'timestamp'}
+            now = time.time()
+            if comparable == last_weather_state and now - last_weather_written_at < WEATHER_STATE_REFRESH:
                 return
-            fallback_data = {
-                'weather': {
-                    'city': 'Error',
-                    'country': '',
-                    'temp': 0,
-                    'feels_like': 0,
-                    'description': 'Error writing state',
-                    'timestamp': time.time()
-                }
-            }
-            with open('.weather_state.toml', 'w', encoding='utf-8') as f:
-                toml.dump(fallback_data, f)
+            write_toml_atomic(state_data, '.weather_state.toml')
+            last_weather_state = comparable
+            last_weather_written_at = now
         except Exception as e:
             print(f"Error writing weather state: {e}")
 
@@ -2456,7 +2485,7 @@ def get_weather_data_by_coords(api_key, lat, lon, units):
             return cached_data
     url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units={units}"
     try:
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url, timeout=10)
         if response.status_code == 429:
             print("Weather API rate limit approached, extending cache")
             if cache_key in weather_cache:
@@ -2479,7 +2508,7 @@ def update_weather_icon(weather_info):
     if weather_info and "icon_id" in weather_info:
         try:
             icon_url = f"http://openweathermap.org/img/wn/{weather_info['icon_id']}.png"
-            resp = requests.get(icon_url, timeout=5)
+            resp = http_client.get(icon_url, timeout=5)
             resp.raise_for_status()
             icon_img = Image.open(BytesIO(resp.content)).convert("RGBA")
             icon_img = icon_img.resize((30, 30), Image.BILINEAR)
@@ -2560,6 +2589,14 @@ SLEEP_TIMEOUT = config["settings"]["sleep_timeout"]
 PROGRESSBAR_DISPLAY = config["settings"]["progressbar_display"]
 ENABLE_CURRENT_TRACK_DISPLAY = config["settings"]["enable_current_track_display"]
 FRAMEBUFFER = config["settings"]["framebuffer"]
+PROGRESS_STATE_FILE = state_bus.volatile_state_path(config["settings"]["volatile_state_dir"], state_bus.PROGRESS_STATE_NAME)
+PROGRESS_FIELDS = ('current_position', 'is_playing', 'timestamp')
+PROGRESS_WRITE_INTERVAL = 5
+PROGRESS_SEEK_TOLERANCE = 3
+WEATHER_STATE_REFRESH = 3600
+PLAY_THRESHOLD = 0.1
+PLAY_END_TOLERANCE = 10
+PLAY_MAX_STEP = 30
 BUTTON_A = config["buttons"]["button_a"]
 BUTTON_B = config["buttons"]["button_b"]
 BUTTON_X = config["buttons"]["button_x"]
@@ -2578,6 +2615,8 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
     init_process_executor()
+    from spotify_auth_manager import start_token_refresher
+    start_token_refresher(exit_event)
     Thread(target=background_generation_worker, daemon=True).start()
     Thread(target=weather_loop, daemon=True).start()
     Thread(target=spotify_loop, daemon=True).start()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import time, uuid, threading, collections
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 2
+MAX_FINISHED_JOBS = 50
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    pass
+
+class JobBusy(Exception):
+    def __init__(self, job):
+        super().__init__(f"A {job.kind} job is already {job.status}")
+        self.job = job
+
+class Job:
+    def __init__(self, kind, runner):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._cancel = threading.Event()
+        self._runner = runner
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds):
+        if self._cancel.wait(seconds):
+            raise JobCancelled()
+
+    def report(self, progress=None, message=None):
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        self._runner._updated(self)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+class JobRunner:
+    def __init__(self, max_workers=MAX_WORKERS, on_update=None, logger=None):
+        self.on_update = on_update
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, exclusive=False, **kwargs):
+        job = Job(kind, self)
+        with self._lock:
+            if exclusive:
+                running = self._active(kind)
+                if running is not None:
+                    raise JobBusy(running)
+            self._jobs[job.id] = job
+            self._prune()
+        self._updated(job)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        with self._lock:
+            if job.status != 'queued':
+                return
+            job.status = 'running'
+        self._updated(job)
+        try:
+            result = func(job, *args, **kwargs)
+            status, error = 'succeeded', None
+        except JobCancelled:
+            result, status, error = None, 'cancelled', None
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.error(f"Job {job.kind} ({job.id}) failed: {e}", exc_info=True)
+            result, status, error = None, 'failed', str(e)
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = status
+            if status == 'succeeded':
+                job.progress = 1.0
+        self._updated(job)
+
+    def _updated(self, job):
+        job.updated_at = time.time()
+        if self.on_update is not None:
+            try:
+                self.on_update(job.to_dict())
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Job update callback error: {e}")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _active(self, kind):
+        for job in self._jobs.values():
+            if job.kind == kind and job.status not in FINISHED_STATES:
+                return job
+        return None
+
+    def active(self, kind):
+        with self._lock:
+            return self._active(kind)
+
+    def list(self):
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            job._cancel.set()
+            was_queued = job.status == 'queued'
+            if was_queued:
+                job.status = 'cancelled'
+        if was_queued:
+            self._updated(job)
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job._cancel.set()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+import re, time, queue, logging, threading, collections
+from logging.handlers import QueueHandler, QueueListener
+
+RATE_LIMIT_MESSAGES = 5
+RATE_LIMIT_WINDOW = 10
+RATE_LIMIT_MAX_KEYS = 512
+RING_BUFFER_SIZE = 1000
+_NUMBERS = re.compile(r'0x[0-9a-fA-F]+|\d+(\.\d+)?')
+
+def message_key(record):
+    return (record.name, record.levelno, _NUMBERS.sub('#', record.getMessage())[:200])
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, rate=RATE_LIMIT_MESSAGES, per=RATE_LIMIT_WINDOW, max_keys=RATE_LIMIT_MAX_KEYS):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.max_keys = max_keys
+        self._windows = collections.OrderedDict()
+        self._totals = collections.Counter()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = message_key(record)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.per:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                self._windows.move_to_end(key)
+                while len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (suppressed {suppressed} similar messages)"
+                    record.args = None
+                return True
+            window[1] += 1
+            if window[1] <= self.rate:
+                return True
+            window[2] += 1
+            self._totals[key[2]] += 1
+            if len(self._totals) > self.max_keys:
+                del self._totals[min(self._totals, key=self._totals.get)]
+            return False
+
+    def suppression_counts(self, limit=20):
+        with self._lock:
+            return self._totals.most_common(limit)
+
+class RingBufferHandler(logging.Handler):
+    def __init__(self, capacity=RING_BUFFER_SIZE):
+        super().__init__()
+        self._lines = collections.deque(maxlen=capacity)
+        self._sequence = 0
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self._sequence += 1
+            self._lines.append((self._sequence, line))
+
+    def recent(self, after=0, limit=None):
+        with self.lock:
+            lines = [entry for entry in self._lines if entry[0] > after]
+            sequence = self._sequence
+        if limit:
+            lines = lines[-limit:]
+        return lines, sequence
+
+class LogPipeline:
+    def __init__(self, handlers, rate_filter=None, ring_buffer=None):
+        self.handlers = list(handlers)
+        self.rate_filter = rate_filter or RateLimitFilter()
+        self.ring_buffer = ring_buffer or RingBufferHandler()
+        self._queue = queue.SimpleQueue()
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def attach(self, logger):
+        queue_handler = QueueHandler(self._queue)
+        queue_handler.addFilter(self.rate_filter)
+        logger.handlers = [queue_handler]
+        self.start()
+        return queue_handler
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = QueueListener(self._queue, *self.handlers, self.ring_buffer, respect_handler_level=True)
+                self._listener.start()
+
+    def stop(self):
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+    def replace_handler(self, predicate, new_handler):
+        self.stop()
+        for handler in [handler for handler in self.handlers if predicate(handler)]:
+            handler.close()
+            self.handlers.remove(handler)
+        self.handlers.append(new_handler)
+        self.start()
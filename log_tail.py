@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import os
+
+BLOCK_SIZE = 8192
+MAX_READ_BYTES = 256 * 1024
+
+def format_cursor(inode, offset):
+    return f"{inode}-{offset}"
+
+def parse_cursor(cursor):
+    try:
+        inode, offset = str(cursor).split('-', 1)
+        return int(inode), int(offset)
+    except (TypeError, ValueError):
+        return None
+
+def tail_lines(path, lines):
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        position = st.st_size
+        data = b''
+        while position > 0 and (lines <= 0 or data.count(b'\n') <= lines):
+            step = min(BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    parts = data.splitlines(keepends=True)
+    if position > 0:
+        parts = parts[1:]
+    if lines > 0:
+        parts = parts[-lines:]
+    return b''.join(parts).decode('utf-8', 'replace'), format_cursor(st.st_ino, st.st_size)
+
+def _read_range(path, offset, limit):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(limit)
+    if len(data) == limit and b'\n' in data:
+        data = data[:data.rfind(b'\n') + 1]
+    return data, offset + len(data)
+
+def read_since(path, cursor, max_bytes=MAX_READ_BYTES, initial_lines=100):
+    parsed = parse_cursor(cursor)
+    st = os.stat(path)
+    if parsed is None:
+        content, new_cursor = tail_lines(path, initial_lines)
+        return content, new_cursor, True
+    inode, offset = parsed
+    reset = False
+    chunks = []
+    if inode != st.st_ino:
+        try:
+            rotated_st = os.stat(f"{path}.1")
+        except OSError:
+            rotated_st = None
+        if rotated_st is None or rotated_st.st_ino != inode or rotated_st.st_size < offset:
+            content, new_cursor = tail_lines(path, initial_lines)
+            return content, new_cursor, True
+        data, rotated_offset = _read_range(f"{path}.1", offset, min(max_bytes, rotated_st.st_size - offset))
+        if rotated_offset < rotated_st.st_size:
+            return data.decode('utf-8', 'replace'), format_cursor(inode, rotated_offset), False
+        chunks.append(data)
+        offset = 0
+    elif st.st_size < offset:
+        offset = 0
+        reset = True
+    data, offset = _read_range(path, offset, max(0, max_bytes - len(b''.join(chunks))))
+    chunks.append(data)
+    return b''.join(chunks).decode('utf-8', 'replace'), format_cursor(st.st_ino, offset), reset
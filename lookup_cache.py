@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import re, json, time, sqlite3, threading
+
+CACHE_PATH = '.lookup_cache.db'
+BUSY_TIMEOUT_MS = 5000
+PURGE_INTERVAL = 3600
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS lookups (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID
+'''
+
+_MISSING = object()
+_cache = None
+_cache_lock = threading.Lock()
+
+def normalise(text):
+    text = re.sub(r'[^\w\s]', '', str(text or '').casefold())
+    return re.sub(r'\s+', ' ', text).strip()
+
+def make_key(*parts):
+    return '|'.join(normalise(part) for part in parts)
+
+class LookupCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._last_purge = 0
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, default=_MISSING):
+        row = self._conn().execute(
+            'SELECT value FROM lookups WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (namespace, key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl):
+        with self._write_lock:
+            self._conn().execute(
+                'INSERT OR REPLACE INTO lookups (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), time.time() + ttl)
+            )
+        self._maybe_purge()
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        with self._write_lock:
+            self._conn().execute('DELETE FROM lookups WHERE expires_at <= ?', (now,))
+
+    def clear(self, namespace=None):
+        with self._write_lock:
+            if namespace is None:
+                self._conn().execute('DELETE FROM lookups')
+            else:
+                self._conn().execute('DELETE FROM lookups WHERE namespace = ?', (namespace,))
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LookupCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Lookup cache unavailable: {e}")
+                return None
+        return _cache
+
+def lookup(namespace, key):
+    cache = get_cache()
+    if cache is None:
+        return _MISSING
+    try:
+        return cache.get(namespace, key)
+    except sqlite3.Error:
+        return _MISSING
+
+def store(namespace, key, value, ttl):
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(namespace, key, value, ttl)
+    except sqlite3.Error:
+        pass
+
+def cached(namespace, key, fetch, ttl, negative_ttl=None):
+    value = lookup(namespace, key)
+    if value is not _MISSING:
+        return value
+    value = fetch()
+    store(namespace, key, value, ttl if value else (negative_ttl or ttl))
+    return value
+
+def is_miss(value):
+    return value is _MISSING
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import time, queue, threading, collections
+import http_client, lookup_cache
+
+LRCLIB_API = "https://lrclib.net/api"
+REQUEST_TIMEOUT = 10
+LYRICS_TTL = 180 * 86400
+LYRICS_NEGATIVE_TTL = 3 * 86400
+DURATION_TOLERANCE = 3
+PREFETCH_LOOKAHEAD = 2
+PREFETCH_QUEUE_SIZE = 16
+PREFETCH_SEEN_SIZE = 256
+PREFETCH_DELAY = 1
+
+class LyricsAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"API returned status code {status_code}")
+        self.status_code = status_code
+
+def lyrics_key(track_name, artist_name, duration=None):
+    return lookup_cache.make_key(track_name, artist_name, int(round(duration)) if duration else '')
+
+def pick_result(results, duration=None):
+    def rank(result):
+        mismatch = bool(duration) and abs((result.get('duration') or 0) - duration) > DURATION_TOLERANCE
+        return (mismatch, not result.get('syncedLyrics'), not (result.get('syncedLyrics') or result.get('plainLyrics')))
+    return min(results, key=rank) if results else None
+
+def _get(path, params=None):
+    response = http_client.get(f"{LRCLIB_API}/{path}", params=params, timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        raise LyricsAPIError(response.status_code)
+    return response.json()
+
+def _fetch(track_name, artist_name, duration=None):
+    result = pick_result(_get('search', {'track_name': track_name, 'artist_name': artist_name}), duration)
+    if result is None:
+        return None
+    if 'syncedLyrics' not in result and 'plainLyrics' not in result and result.get('id'):
+        result = _get(f"get/{result['id']}")
+    if not (result.get('syncedLyrics') or result.get('plainLyrics')):
+        return None
+    return {
+        'lyrics': result.get('syncedLyrics') or '',
+        'plain_lyrics': result.get('plainLyrics') or '',
+        'track_name': result.get('trackName', track_name),
+        'artist_name': result.get('artistName', artist_name),
+        'album_name': result.get('albumName', ''),
+        'duration': result.get('duration', 0)
+    }
+
+def fetch_lyrics(track_name, artist_name, duration=None):
+    return lookup_cache.cached('lyrics', lyrics_key(track_name, artist_name, duration),
+                               lambda: _fetch(track_name, artist_name, duration),
+                               LYRICS_TTL, LYRICS_NEGATIVE_TTL)
+
+def is_cached(track_name, artist_name, duration=None):
+    return not lookup_cache.is_miss(lookup_cache.lookup('lyrics', lyrics_key(track_name, artist_name, duration)))
+
+class LyricsPrefetcher:
+    def __init__(self, delay=PREFETCH_DELAY, logger=None):
+        self.delay = delay
+        self.logger = logger
+        self._pending = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def offer(self, track_name, artist_name, duration=None):
+        if not track_name or not artist_name:
+            return
+        key = lyrics_key(track_name, artist_name, duration)
+        with self._lock:
+            if key in self._seen:
+                return
+            self._seen[key] = True
+            while len(self._seen) > PREFETCH_SEEN_SIZE:
+                self._seen.popitem(last=False)
+        try:
+            self._pending.put_nowait((key, track_name, artist_name, duration))
+        except queue.Full:
+            with self._lock:
+                self._seen.pop(key, None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            key, track_name, artist_name, duration = self._pending.get()
+            if is_cached(track_name, artist_name, duration):
+                continue
+            try:
+                fetch_lyrics(track_name, artist_name, duration)
+                if self.logger is not None:
+                    self.logger.debug(f"Prefetched lyrics for {artist_name} - {track_name}")
+            except Exception as e:
+                with self._lock:
+                    self._seen.pop(key, None)
+                if self.logger is not None:
+                    self.logger.debug(f"Lyrics prefetch failed for {artist_name} - {track_name}: {e}")
+            time.sleep(self.delay)
@@ -1,21 +1,57 @@
 #!/usr/bin/env python3
-from flask import Flask, request, redirect, url_for, flash, Response, render_template, send_file, jsonify
+from flask import Flask, request, redirect, url_for, flash, Response, render_template, jsonify
 from spotipy.oauth2 import SpotifyOAuth
+from spotify_auth_manager import AtomicCacheFileHandler, start_token_refresher
 from datetime import datetime, timezone
 from collections import Counter
 from functools import wraps
 from logging.handlers import RotatingFileHandler
-import os, toml, time, requests, subprocess, sys, signal, urllib.parse, socket, logging, threading, json, hashlib, spotipy, io, sqlite3, shutil, re, random
+from PIL import Image, ImageDraw
+import os, toml, time, requests, subprocess, sys, signal, urllib.parse, socket, logging, threading, json, hashlib, spotipy, io, shutil, re, random, queue, collections
+import http_client, state_bus, log_tail, track_resolver, lookup_cache, lyrics
+from spotify_search import SpotifySearchService
+from log_pipeline import LogPipeline, RateLimitFilter
+from job_runner import JobRunner, JobCancelled, JobBusy
+from process_supervisor import ProcessSupervisor
+import song_stats_db
+from song_stats_db import SongStatsDB
+from health_monitor import HealthMonitor, check_internet_connection
 
 app = Flask(__name__)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 
+IMMUTABLE_STATIC_SUFFIXES = ('.ttf', '.otf', '.woff', '.woff2')
+BOOT_ID = os.urandom(4).hex()
+
 @app.after_request
 def add_header(response):
+    if request.endpoint == 'static':
+        if request.path.endswith(IMMUTABLE_STATIC_SUFFIXES):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+    if 'Cache-Control' in response.headers:
+        return response
+    if response.headers.get('ETag'):
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     return response
+
+def content_etag(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def conditional_json(etag, build):
+    etag = f"{BOOT_ID}-{etag}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    return response
 app.secret_key = 'hud-launcher-secret-key'
 
 CONFIG_PATH = "config.toml"
@@ -50,7 +86,8 @@ DEFAULT_CONFIG = {
         "time_display": True,
         "progressbar_display": True,
         "enable_current_track_display": True,
-        "sleep_timeout": 300
+        "sleep_timeout": 300,
+        "volatile_state_dir": "/dev/shm"
     },
     "wifi": {
         "ap_ssid": "Neonwifi-Manager",
@@ -83,7 +120,9 @@ DEFAULT_CONFIG = {
     },
     "logging": {
         "max_log_lines": 10000,
-        "max_backup_files": 5
+        "max_backup_files": 5,
+        "rate_limit_messages": 5,
+        "rate_limit_window": 10
     },
     "ui": {
         "theme": "dark",
@@ -92,46 +131,133 @@ DEFAULT_CONFIG = {
     "api_status": {}
 }
 
-hud_process = None
-neonwifi_process = None
-last_logged_song = None
+hud_supervisor = None
+lyrics_prefetcher = None
+search_service = SpotifySearchService()
+job_runner = JobRunner(on_update=lambda job: publish_job_update(job))
+song_db = SongStatsDB(on_commit=lambda: bump_stats_version())
+health_monitor = HealthMonitor(on_change=lambda state: notify_state_change())
+neonwifi_supervisor = None
+play_event_thread = None
+log_pipeline = None
+play_events = queue.Queue()
+PLAY_EVENT_BATCH_SIZE = 50
+PLAY_EVENT_BATCH_WAIT = 0.5
+PLAY_EVENT_SEEN_SIZE = 1024
+state_bus_server = None
+state_file_cache = state_bus.StateFileCache(toml.load)
+track_hub = state_bus.BroadcastHub(max_subscribers=20)
+event_hub = state_bus.BroadcastHub(max_subscribers=20)
+event_broadcaster_thread = None
+event_broadcaster_lock = threading.Lock()
+broadcast_wake = threading.Event()
+stats_version = 0
+album_art_files = None
+album_art_sources = collections.OrderedDict()
+album_art_variants = {}
+album_art_lock = threading.Lock()
+ALBUM_ART_PATH = 'static/current_album_art.jpg'
+ALBUM_ART_SIZES = (64, 150, 300)
+ALBUM_ART_FORMATS = {'jpg': ('JPEG', 'image/jpeg'), 'webp': ('WEBP', 'image/webp')}
+MAX_CACHED_ALBUM_ART = 4
+SSE_KEEPALIVE_INTERVAL = 15
+LOG_STREAM_POLL_INTERVAL = 1
+MAX_LOG_STREAMS = 20
+log_stream_slots = threading.BoundedSemaphore(MAX_LOG_STREAMS)
+EVENT_BROADCAST_INTERVAL = 2
+SIMILAR_TRACKS_LIMIT = 75
+SIMILAR_TRACKS_FETCH = 150
+LASTFM_SIMILAR_TTL = 7 * 86400
+LASTFM_SIMILAR_NEGATIVE_TTL = 86400
+RECOMMENDS_PLAYLIST_FILE = '.recommends_playlist.json'
+progress_state_file = None
 
 # ============== HELPER FUNCTIONS ==============
 
-def delete_existing_playlist(playlist_name, sp):
-    user_id = sp.current_user()["id"]
-    logger = logging.getLogger('Launcher')
-    all_playlists = []
+def load_recommends_playlist():
+    try:
+        with open(RECOMMENDS_PLAYLIST_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_recommends_playlist(playlist, user_id):
+    data = {
+        'id': playlist['id'],
+        'uri': playlist['uri'],
+        'url': playlist['external_urls']['spotify'],
+        'user_id': user_id
+    }
+    temp_path = f"{RECOMMENDS_PLAYLIST_FILE}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_path, RECOMMENDS_PLAYLIST_FILE)
+    except OSError as e:
+        logger = logging.getLogger('Launcher')
+        logger.warning(f"Could not save {RECOMMENDS_PLAYLIST_FILE}: {e}")
+    return data
+
+def find_existing_playlist(playlist_name, sp, user_id):
     results = sp.current_user_playlists(limit=50)
-    all_playlists.extend(results['items'])
-    while results['next']:
-        results = sp.next(results)
-        all_playlists.extend(results['items'])
-    matching_playlists = []
-    for playlist in all_playlists:
-        if (playlist['name'].lower() == playlist_name.lower() and 
-            playlist['owner']['id'] == user_id):
-            matching_playlists.append(playlist)
-    deleted_count = 0
-    for playlist in matching_playlists:
+    while results:
+        for playlist in results['items']:
+            if (playlist['name'].lower() == playlist_name.lower() and
+                playlist['owner']['id'] == user_id):
+                return playlist
+        results = sp.next(results) if results['next'] else None
+    return None
+
+def clear_recommends_playlist():
+    try:
+        os.remove(RECOMMENDS_PLAYLIST_FILE)
+    except OSError:
+        pass
+
+def get_recommends_playlist(playlist_name, description, sp, use_stored=True):
+    logger = logging.getLogger('Launcher')
+    user_id = sp.current_user()["id"]
+    stored = load_recommends_playlist() if use_stored else None
+    if stored and stored.get('user_id') == user_id:
         try:
-            sp.current_user_unfollow_playlist(playlist['id'])
-            deleted_count += 1
+            if not sp.playlist_is_following(stored['id'], [user_id])[0]:
+                sp.current_user_follow_playlist(stored['id'])
+            sp.playlist_change_details(stored['id'], description=description)
+            return stored
         except Exception as e:
-            logger.warning(f"Failed to delete playlist via Spotipy: {e}")
-            try:
-                headers = {
-                    'Authorization': f'Bearer {sp.auth_manager.get_access_token()["access_token"]}'
-                }
-                url = f"https://api.spotify.com/v1/playlists/{playlist['id']}/followers"
-                response = requests.delete(url, headers=headers)
-                if response.status_code == 200:
-                    deleted_count += 1
-                else:
-                    logger.error(f"Direct API deletion failed: {response.status_code}")
-            except Exception as e2:
-                logger.error(f"❌ All deletion methods failed: {e2}")
-    return deleted_count
+            logger.warning(f"Stored playlist unavailable, looking it up again: {e}")
+    if stored:
+        clear_recommends_playlist()
+    playlist = find_existing_playlist(playlist_name, sp, user_id)
+    if playlist:
+        sp.playlist_change_details(playlist['id'], description=description)
+    else:
+        playlist = sp.user_playlist_create(
+            user=user_id,
+            name=playlist_name,
+            public=False,
+            description=description
+        )
+    return save_recommends_playlist(playlist, user_id)
+
+def replace_playlist_tracks(playlist_id, track_ids, sp):
+    sp.playlist_replace_items(playlist_id, track_ids[:100])
+    for i in range(100, len(track_ids), 100):
+        sp.playlist_add_items(playlist_id, track_ids[i:i+100])
+
+def update_recommends_playlist(playlist_name, description, track_ids, sp):
+    playlist = get_recommends_playlist(playlist_name, description, sp)
+    try:
+        replace_playlist_tracks(playlist['id'], track_ids, sp)
+    except spotipy.exceptions.SpotifyException as e:
+        if e.http_status not in (403, 404):
+            raise
+        logger = logging.getLogger('Launcher')
+        logger.warning(f"Could not update stored playlist, recreating it: {e}")
+        clear_recommends_playlist()
+        playlist = get_recommends_playlist(playlist_name, description, sp, use_stored=False)
+        replace_playlist_tracks(playlist['id'], track_ids, sp)
+    return playlist
 
 def generate_chart_data(stats, label_type):
     if not stats:
@@ -166,6 +292,10 @@ def get_active_device(sp):
 def get_lastfm_similar_tracks(artist_name, track_name, api_key, limit=50):
     if not api_key:
         return []
+    cache_key = lookup_cache.make_key(artist_name, track_name)
+    entry = lookup_cache.lookup('lastfm_similar', cache_key)
+    if not lookup_cache.is_miss(entry) and (entry['limit'] >= limit or len(entry['tracks']) < entry['limit']):
+        return entry['tracks'][:limit]
     lastfm_url = "http://ws.audioscrobbler.com/2.0/"
     params = {
         "method": "track.getsimilar",
@@ -176,10 +306,15 @@ def get_lastfm_similar_tracks(artist_name, track_name, api_key, limit=50):
         "limit": limit
     }
     try:
-        response = requests.get(lastfm_url, params=params, timeout=10)
+        response = http_client.get(lastfm_url, params=params, timeout=10)
         if response.status_code == 200:
             data = response.json()
-            similar_tracks = data.get("similartracks", {}).get("track", [])
+            similar_tracks = [
+                {'name': track.get('name', ''), 'artist': {'name': track.get('artist', {}).get('name', '')}, 'match': track.get('match')}
+                for track in data.get("similartracks", {}).get("track", [])
+            ]
+            lookup_cache.store('lastfm_similar', cache_key, {'limit': limit, 'tracks': similar_tracks},
+                               LASTFM_SIMILAR_TTL if similar_tracks else LASTFM_SIMILAR_NEGATIVE_TTL)
             return similar_tracks
         else:
             logger = logging.getLogger('Launcher')
@@ -233,76 +368,141 @@ def rate_limit(min_interval=1):
         return wrapped
     return decorator
 
-def search_lyrics_for_track(track_name, artist_name):
+def search_lyrics_for_track(track_name, artist_name, duration=None):
+    logger = logging.getLogger('Launcher')
     try:
-        api_url = "https://lrclib.net/api/search"
-        params = {
-            'track_name': track_name,
-            'artist_name': artist_name
-        }
-        logger = logging.getLogger('Launcher')
-        response = requests.get(api_url, params=params, timeout=10)
-        if response.status_code == 200:
-            results = response.json()
-            if results:
-                first_result = results[0]
-                lyrics_id = first_result.get('id')
-                if lyrics_id:
-                    lyrics_response = requests.get(f"https://lrclib.net/api/get/{lyrics_id}", timeout=10)
-                    if lyrics_response.status_code == 200:
-                        lyrics_data = lyrics_response.json()
-                        return {
-                            'success': True,
-                            'lyrics': lyrics_data.get('syncedLyrics', ''),
-                            'plain_lyrics': lyrics_data.get('plainLyrics', ''),
-                            'track_name': lyrics_data.get('trackName', track_name),
-                            'artist_name': lyrics_data.get('artistName', artist_name),
-                            'album_name': lyrics_data.get('albumName', ''),
-                            'duration': lyrics_data.get('duration', 0)
-                        }
+        result = lyrics.fetch_lyrics(track_name, artist_name, duration)
+        if not result:
             return {'success': False, 'error': 'No lyrics found for this track'}
-        else:
-            logger.error(f"LRCLib API error: {response.status_code}")
-            return {'success': False, 'error': f'API returned status code {response.status_code}'}
+        return dict(result, success=True)
+    except lyrics.LyricsAPIError as e:
+        logger.error(f"LRCLib API error: {e.status_code}")
+        return {'success': False, 'error': str(e)}
     except requests.RequestException as e:
-        logger = logging.getLogger('Launcher')
         logger.error(f"Lyrics search network error: {e}")
         return {'success': False, 'error': f'Network error: {str(e)}'}
     except Exception as e:
-        logger = logging.getLogger('Launcher')
         logger.error(f"Lyrics search unexpected error: {e}")
         return {'success': False, 'error': f'Unexpected error: {str(e)}'}
 
+def prefetch_lyrics(topic, data):
+    if lyrics_prefetcher is None or not data:
+        return
+    if topic == 'current_track' and isinstance(data, dict):
+        if data.get('title') not in (None, 'No track playing', 'Unknown Track'):
+            lyrics_prefetcher.offer(data.get('title'), lyrics_artist(data.get('artists')), data.get('duration'))
+    elif topic == 'queue' and isinstance(data, list):
+        upcoming = [track for track in data if isinstance(track, dict) and not track.get('is_current')]
+        for track in upcoming[:lyrics.PREFETCH_LOOKAHEAD]:
+            lyrics_prefetcher.offer(track.get('name'), lyrics_artist(track.get('artists')), track.get('duration'))
+
+def lyrics_artist(artists):
+    if isinstance(artists, list):
+        artists = ', '.join(artists)
+    artists = artists or ''
+    if '(' in artists:
+        artists = artists.split('(')[0].strip()
+    return artists
+
+def start_lyrics_prefetcher():
+    global lyrics_prefetcher
+    if lyrics_prefetcher is not None or state_bus_server is None:
+        return
+    lyrics_prefetcher = lyrics.LyricsPrefetcher(logger=logging.getLogger('Launcher'))
+    lyrics_prefetcher.start()
+    state_bus_server.subscribe(prefetch_lyrics)
+    for topic in ('current_track', 'queue'):
+        prefetch_lyrics(topic, state_bus_server.get(topic))
+
 def search_spotify_track(track_name, artist_name, sp):
     try:
-        result = sp.search(q=f"track:{track_name} artist:{artist_name}", type='track', limit=1)
-        items = result['tracks']['items']
-        if items:
-            return items[0]['id']
+        return track_resolver.search_track_id(sp, track_name, artist_name)
     except Exception as e:
         logger = logging.getLogger('Launcher')
         logger.error(f"Error searching Spotify track: {e}")
     return None
 
 def search_spotify_track_ids(track_list, sp):
-    spotify_track_ids = []
     logger = logging.getLogger('Launcher')
-    for track in track_list:
-        name = track.get('name', '')
-        artist = track.get('artist', {}).get('name', '')
-        if not name or not artist:
-            continue
-        try:
-            result = sp.search(q=f"track:{name} artist:{artist}", type='track', limit=1)
-            items = result['tracks']['items']
-            if items:
-                track_id = items[0]['id']
-                spotify_track_ids.append(track_id)
-            else:
-                logger.info(f"  Not found on Spotify: {name} by {artist}")
-        except Exception as e:
-            logger.error(f"  Error searching for {name} by {artist}: {e}")
-    return spotify_track_ids
+    candidates = [(track.get('name', ''), track.get('artist', {}).get('name', '')) for track in track_list]
+    candidates = [(name, artist) for name, artist in candidates if name and artist]
+    track_ids = track_resolver.resolve_tracks(sp, candidates, logger=logger)
+    for (name, artist), track_id in zip(candidates, track_ids):
+        if not track_id:
+            logger.info(f"  Not found on Spotify: {name} by {artist}")
+    return candidates, track_ids
+
+def similar_playlist_job(job, track_name, artist_name, lastfm_key):
+    sp, message = get_spotify_client()
+    if not sp:
+        return {'success': False, 'error': message}
+    if artist_name is None:
+        job.report(0.05, f'Looking up "{track_name}"...')
+        result = track_resolver.call_spotify(sp.search, q=f"track:{track_name}", type='track', limit=1)
+        items = result['tracks']['items']
+        if not items:
+            return {'success': False, 'error': f'Track "{track_name}" not found on Spotify'}
+        track_name = items[0]['name']
+        artist_name = items[0]['artists'][0]['name']
+    return build_similar_playlist(sp, track_name, artist_name, lastfm_key, job)
+
+def build_similar_playlist(sp, track_name, artist_name, lastfm_key, job=None):
+    logger = logging.getLogger('Launcher')
+    report = job.report if job is not None else (lambda progress=None, message=None: None)
+    report(0.1, f'Finding tracks similar to "{track_name}"...')
+    original_track_id = search_spotify_track(track_name, artist_name, sp)
+    if not original_track_id:
+        return {'success': False, 'error': f'Track "{track_name}" by {artist_name} not found on Spotify'}
+    similar_tracks = get_lastfm_similar_tracks(artist_name, track_name, lastfm_key, limit=SIMILAR_TRACKS_FETCH)
+    if not similar_tracks:
+        logger.warning(f"No similar tracks found on Last.fm for: {track_name} by {artist_name}")
+        return {'success': False, 'error': 'No similar tracks found on Last.fm'}
+    logger.info("Searching for similar tracks on Spotify...")
+    report(0.2, 'Searching for similar tracks on Spotify...')
+    candidates, track_ids = search_spotify_track_ids(similar_tracks[:SIMILAR_TRACKS_LIMIT], sp)
+    if job is not None:
+        job.check_cancelled()
+    spotify_track_ids = [track_id for track_id in track_ids if track_id]
+    not_found_count = len(candidates) - len(spotify_track_ids)
+    extra_track_ids = []
+    spare_tracks = similar_tracks[SIMILAR_TRACKS_LIMIT:]
+    if not_found_count > 0 and spotify_track_ids:
+        logger.info(f"Adding {not_found_count} extra song(s) to compensate for {not_found_count} not found")
+        already_tried = {(name.lower(), artist.lower()) for name, artist in candidates}
+        spare_tracks = [track for track in spare_tracks
+                        if (track.get('name', '').lower(), track.get('artist', {}).get('name', '').lower()) not in already_tried]
+        report(0.7, f'Finding {not_found_count} replacement track(s)...')
+        while spare_tracks and len(extra_track_ids) < not_found_count:
+            if job is not None:
+                job.check_cancelled()
+            batch_size = max(track_resolver.MAX_WORKERS, not_found_count - len(extra_track_ids))
+            batch, spare_tracks = spare_tracks[:batch_size], spare_tracks[batch_size:]
+            extra_candidates, extra_ids = search_spotify_track_ids(batch, sp)
+            for (name, artist), track_id in zip(extra_candidates, extra_ids):
+                if len(extra_track_ids) >= not_found_count:
+                    break
+                if track_id and track_id not in spotify_track_ids and track_id not in extra_track_ids:
+                    extra_track_ids.append(track_id)
+                    logger.info(f"  Found extra track: {name} by {artist}")
+    random.shuffle(spotify_track_ids)
+    all_track_ids = [original_track_id] + spotify_track_ids + extra_track_ids
+    playlist_name = f"NeonDisplay Recommends"
+    description = (f"Tracks similar to {track_name} by {artist_name} - Generated by NeonDisplay ")
+    report(0.85, 'Updating playlist...')
+    playlist = update_recommends_playlist(playlist_name, description, all_track_ids, sp)
+    play_success = play_playlist(playlist['uri'], sp)
+    return {
+        'success': True,
+        'message': f'Created playlist "{playlist_name}" with {len(all_track_ids)} tracks',
+        'playlist_name': playlist_name,
+        'playlist_url': playlist['url'],
+        'track_count': len(all_track_ids),
+        'found_count': len(spotify_track_ids),
+        'not_found_count': not_found_count,
+        'extra_added_count': len(extra_track_ids),
+        'auto_played': play_success,
+        'random_order': True
+    }
 
 # ============== CONFIGURATION ROUTES ==============
 
@@ -322,7 +522,7 @@ def index():
                 expires_at = cache.get('expires_at', 0)
                 spotify_authenticated = expires_at > (time.time() + 300)
             except:
-                spotify_authenticated, _ = check_spotify_auth(timeout=2)
+                spotify_authenticated, _ = check_spotify_auth()
         else:
             spotify_authenticated = False
     hud_running = is_hud_running()
@@ -439,12 +639,10 @@ def save_all_config():
     save_config(config)
     if is_hud_running():
         stop_hud()
-        time.sleep(3)
     if auto_start_hud == True:
         start_hud()
     if is_neonwifi_running():
         stop_neonwifi()
-        time.sleep(3)
     if auto_start_neonwifi == True:
         start_neonwifi()
     flash('success', 'All settings saved successfully!')
@@ -677,7 +875,7 @@ def spotify_auth_page():
             client_secret=config["api_keys"]["client_secret"],
             redirect_uri=config["api_keys"]["redirect_uri"],
             scope="user-read-currently-playing user-modify-playback-state user-read-playback-state playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative user-read-private user-library-read user-library-modify",
-            cache_path=".spotify_cache",
+            cache_handler=AtomicCacheFileHandler(cache_path=".spotify_cache"),
             show_dialog=True
         )
         auth_url = sp_oauth.get_authorize_url()
@@ -710,10 +908,11 @@ def process_callback_url():
             client_secret=config["api_keys"]["client_secret"],
             redirect_uri=config["api_keys"]["redirect_uri"],
             scope="user-read-currently-playing user-modify-playback-state user-read-playback-state playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative user-read-private user-library-read user-library-modify",
-            cache_path=".spotify_cache"
+            cache_handler=AtomicCacheFileHandler(cache_path=".spotify_cache")
         )
         token_info = sp_oauth.get_access_token(code, as_dict=False)
         if token_info:
+            health_monitor.request_check(auth=True)
             flash('success', 'Spotify authentication successful!')
         else:
             flash('error', 'Spotify authentication failed.')
@@ -726,7 +925,6 @@ def process_callback_url():
 # ============== SPOTIFY CONTROL ROUTES ==============
 
 @app.route('/spotify_create_similar_playlist', methods=['POST'])
-@rate_limit(2.0)
 def spotify_create_similar_playlist():
     logger = logging.getLogger('Launcher')
     try:
@@ -741,105 +939,16 @@ def spotify_create_similar_playlist():
             if '(' in artist_name:
                 artist_name = artist_name.split('(')[0].strip()
         logger.info(f"Creating similar playlist for: {track_name} by {artist_name}")
-        sp, message = get_spotify_client()
-        if not sp:
-            return jsonify({'success': False, 'error': message})
         config = load_config()
         lastfm_key = config["api_keys"].get("lastfm", "")
         if not lastfm_key:
             return jsonify({'success': False, 'error': 'Last.fm API key not configured'})
-        original_track_id = search_spotify_track(track_name, artist_name, sp)
-        if not original_track_id:
-            return jsonify({'success': False, 'error': f'Track "{track_name}" by {artist_name} not found on Spotify'})
-        similar_tracks = get_lastfm_similar_tracks(artist_name, track_name, lastfm_key, limit=75)
-        if not similar_tracks:
-            logger.warning(f"No similar tracks found on Last.fm for: {track_name} by {artist_name}")
-            return jsonify({'success': False, 'error': 'No similar tracks found on Last.fm'})
-        not_found_count = 0
-        spotify_track_ids = []
-        logger.info("Searching for similar tracks on Spotify...")
-        for track in similar_tracks:
-            name = track.get('name', '')
-            artist = track.get('artist', {}).get('name', '')
-            if not name or not artist:
-                continue
-            try:
-                result = sp.search(q=f"track:{name} artist:{artist}", type='track', limit=1)
-                items = result['tracks']['items']
-                if items:
-                    track_id = items[0]['id']
-                    spotify_track_ids.append(track_id)
-                else:
-                    logger.info(f"  Not found on Spotify: {name} by {artist}")
-                    not_found_count += 1
-            except Exception as e:
-                logger.error(f"  Error searching for {name} by {artist}: {e}")
-                not_found_count += 1
-        extra_songs_needed = not_found_count
-        extra_track_ids = []
-        if extra_songs_needed > 0 and spotify_track_ids:
-            logger.info(f"Adding {extra_songs_needed} extra song(s) to compensate for {not_found_count} not found")
-            extra_similar_tracks = get_lastfm_similar_tracks(artist_name, track_name, lastfm_key, limit=75 + extra_songs_needed * 2)
-            if extra_similar_tracks:
-                already_tried = {(track.get('name', '').lower(), track.get('artist', {}).get('name', '').lower()) for track in similar_tracks}
-                for extra_track in extra_similar_tracks:
-                    if len(extra_track_ids) >= extra_songs_needed:
-                        break
-                    name = extra_track.get('name', '')
-                    artist = extra_track.get('artist', {}).get('name', '')
-                    if not name or not artist:
-                        continue
-                    if (name.lower(), artist.lower()) in already_tried:
-                        continue
-                    try:
-                        result = sp.search(q=f"track:{name} artist:{artist}", type='track', limit=1)
-                        items = result['tracks']['items']
-                        if items:
-                            track_id = items[0]['id']
-                            if track_id not in spotify_track_ids and track_id not in extra_track_ids:
-                                extra_track_ids.append(track_id)
-                                logger.info(f"  Found extra track: {name} by {artist}")
-                    except Exception as e:
-                        logger.error(f"  Error searching for extra track {name} by {artist}: {e}")
-        all_track_ids = [original_track_id] + spotify_track_ids + extra_track_ids
-        random.shuffle(spotify_track_ids)
-        all_track_ids = [original_track_id] + spotify_track_ids + extra_track_ids
-        playlist_name = f"NeonDisplay Recommends"
-        deleted_count = delete_existing_playlist(playlist_name, sp)
-        user_id = sp.current_user()["id"]
-        description = (f"Tracks similar to {track_name} by {artist_name} - Generated by NeonDisplay ")
-        playlist = sp.user_playlist_create(
-            user=user_id,
-            name=playlist_name,
-            public=False,
-            description=description
-        )
-        if all_track_ids:
-            for i in range(0, len(all_track_ids), 100):
-                batch = all_track_ids[i:i+100]
-                sp.user_playlist_add_tracks(user_id, playlist["id"], batch)
-            time.sleep(1)
-            play_success = play_playlist(playlist['uri'], sp)
-            return jsonify({
-                'success': True,
-                'message': f'Created playlist "{playlist_name}" with {len(all_track_ids)} tracks',
-                'playlist_name': playlist_name,
-                'playlist_url': playlist['external_urls']['spotify'],
-                'track_count': len(all_track_ids),
-                'found_count': len(spotify_track_ids),
-                'not_found_count': not_found_count,
-                'extra_added_count': len(extra_track_ids),
-                'auto_played': play_success,
-                'random_order': True
-            })
-        else:
-            return jsonify({'success': False, 'error': 'No tracks to add to playlist'})
+        return submit_job('similar_playlist', similar_playlist_job, track_name, artist_name, lastfm_key)
     except Exception as e:
         logger.error(f"Error creating similar playlist: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'error': f'Error creating playlist: {str(e)}'})
 
 @app.route('/spotify_generate_from_input', methods=['POST'])
-@rate_limit(2.0)
 def spotify_generate_from_input():
     logger = logging.getLogger('Launcher')
     try:
@@ -847,109 +956,11 @@ def spotify_generate_from_input():
         if not input_string:
             return jsonify({'success': False, 'error': 'No input string provided'})
         track_name, artist_name = parse_track_input(input_string)
-        if artist_name is None:
-            sp, message = get_spotify_client()
-            if not sp:
-                return jsonify({'success': False, 'error': message})
-            result = sp.search(q=f"track:{track_name}", type='track', limit=1)
-            items = result['tracks']['items']
-            if not items:
-                return jsonify({'success': False, 'error': f'Track "{track_name}" not found on Spotify'})
-            track_name = items[0]['name']
-            artist_name = items[0]['artists'][0]['name']
-        sp, message = get_spotify_client()
-        if not sp:
-            return jsonify({'success': False, 'error': message})
         config = load_config()
         lastfm_key = config["api_keys"].get("lastfm", "")
         if not lastfm_key:
             return jsonify({'success': False, 'error': 'Last.fm API key not configured'})
-        original_track_id = search_spotify_track(track_name, artist_name, sp)
-        if not original_track_id:
-            return jsonify({'success': False, 'error': f'Track "{track_name}" by {artist_name} not found on Spotify'})
-        similar_tracks = get_lastfm_similar_tracks(artist_name, track_name, lastfm_key, limit=75)
-        if not similar_tracks:
-            logger.warning(f"No similar tracks found on Last.fm for: {track_name} by {artist_name}")
-            return jsonify({'success': False, 'error': 'No similar tracks found on Last.fm'})
-        not_found_count = 0
-        spotify_track_ids = []
-        logger.info("Searching for similar tracks on Spotify...")
-        for track in similar_tracks:
-            name = track.get('name', '')
-            artist = track.get('artist', {}).get('name', '')
-            if not name or not artist:
-                continue
-            try:
-                result = sp.search(q=f"track:{name} artist:{artist}", type='track', limit=1)
-                items = result['tracks']['items']
-                if items:
-                    track_id = items[0]['id']
-                    spotify_track_ids.append(track_id)
-                else:
-                    logger.info(f"  Not found on Spotify: {name} by {artist}")
-                    not_found_count += 1
-            except Exception as e:
-                logger.error(f"  Error searching for {name} by {artist}: {e}")
-                not_found_count += 1
-        extra_songs_needed = not_found_count
-        extra_track_ids = []
-        if extra_songs_needed > 0 and spotify_track_ids:
-            logger.info(f"Adding {extra_songs_needed} extra song(s) to compensate for {not_found_count} not found")
-            extra_similar_tracks = get_lastfm_similar_tracks(artist_name, track_name, lastfm_key, limit=75 + extra_songs_needed * 2)
-            if extra_similar_tracks:
-                already_tried = {(track.get('name', '').lower(), track.get('artist', {}).get('name', '').lower()) for track in similar_tracks}
-                for extra_track in extra_similar_tracks:
-                    if len(extra_track_ids) >= extra_songs_needed:
-                        break
-                    name = extra_track.get('name', '')
-                    artist = extra_track.get('artist', {}).get('name', '')
-                    if not name or not artist:
-                        continue
-                    if (name.lower(), artist.lower()) in already_tried:
-                        continue
-                    try:
-                        result = sp.search(q=f"track:{name} artist:{artist}", type='track', limit=1)
-                        items = result['tracks']['items']
-                        if items:
-                            track_id = items[0]['id']
-                            if track_id not in spotify_track_ids and track_id not in extra_track_ids:
-                                extra_track_ids.append(track_id)
-                                logger.info(f"  Found extra track: {name} by {artist}")
-                    except Exception as e:
-                        logger.error(f"  Error searching for extra track {name} by {artist}: {e}")
-        all_track_ids = [original_track_id] + spotify_track_ids + extra_track_ids
-        random.shuffle(spotify_track_ids)
-        all_track_ids = [original_track_id] + spotify_track_ids + extra_track_ids
-        playlist_name = f"NeonDisplay Recommends"
-        deleted_count = delete_existing_playlist(playlist_name, sp)
-        user_id = sp.current_user()["id"]
-        description = (f"Tracks similar to {track_name} by {artist_name} - Generated by NeonDisplay ")
-        playlist = sp.user_playlist_create(
-            user=user_id,
-            name=playlist_name,
-            public=False,
-            description=description
-        )
-        if all_track_ids:
-            for i in range(0, len(all_track_ids), 100):
-                batch = all_track_ids[i:i+100]
-                sp.user_playlist_add_tracks(user_id, playlist["id"], batch)
-            time.sleep(1)
-            play_success = play_playlist(playlist['uri'], sp)
-            return jsonify({
-                'success': True,
-                'message': f'Created playlist "{playlist_name}" with {len(all_track_ids)} tracks',
-                'playlist_name': playlist_name,
-                'playlist_url': playlist['external_urls']['spotify'],
-                'track_count': len(all_track_ids),
-                'found_count': len(spotify_track_ids),
-                'not_found_count': not_found_count,
-                'extra_added_count': len(extra_track_ids),
-                'auto_played': play_success,
-                'random_order': True
-            })
-        else:
-            return jsonify({'success': False, 'error': 'No tracks to add to playlist'})
+        return submit_job('similar_playlist', similar_playlist_job, track_name, artist_name, lastfm_key)
     except Exception as e:
         logger.error(f"Error generating playlist from input: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'error': f'Error: {str(e)}'})
@@ -974,7 +985,7 @@ def spotify_like_track():
 @app.route('/spotify_next', methods=['POST'])
 @rate_limit(0.5)
 def spotify_next():
-    if not check_internet_connection(timeout=3):
+    if not health_monitor.is_online():
         return {'success': False, 'error': 'No internet connection'}
     try:
         sp, message = get_spotify_client()
@@ -1004,7 +1015,7 @@ def spotify_pause():
 @app.route('/spotify_play', methods=['POST'])
 @rate_limit(0.5)
 def spotify_play():
-    if not check_internet_connection(timeout=3):
+    if not health_monitor.is_online():
         return {'success': False, 'error': 'No internet connection'}
     try:
         sp, message = get_spotify_client()
@@ -1058,7 +1069,7 @@ def spotify_play_track():
 @app.route('/spotify_previous', methods=['POST'])
 @rate_limit(0.5)
 def spotify_previous():
-    if not check_internet_connection(timeout=3):
+    if not health_monitor.is_online():
         return {'success': False, 'error': 'No internet connection'}
     try:
         sp, message = get_spotify_client()
@@ -1110,56 +1121,56 @@ def spotify_shuffle_queue():
 
 @app.route('/spotify_shuffle_toggle', methods=['POST'])
 def spotify_shuffle_toggle():
+    return submit_job('shuffle_toggle', shuffle_toggle_job)
+
+def shuffle_toggle_job(job):
     logger = logging.getLogger('Launcher')
+    sp, message = get_spotify_client()
+    if not sp:
+        return {'success': False, 'error': message}
+    playback = sp.current_playback()
+    if not playback:
+        return {'success': False, 'error': 'No active device'}
+    current = playback.get("shuffle_state", False)
+    if current:
+        new_state = False
+    else:
+        new_state = True
     try:
-        sp, message = get_spotify_client()
-        if not sp:
-            return {'success': False, 'error': message}
-        playback = sp.current_playback()
-        if not playback:
-            return {'success': False, 'error': 'No active device'}
-        current = playback.get("shuffle_state", False)
-        if current:
-            new_state = False
-        else:
-            new_state = True
-        try:
-            sp.shuffle(new_state)
-            current_position_ms = playback.get('progress_ms', 0)
-            if current_position_ms is not None:
-                try:
-                    time.sleep(0.3)
-                    sp.seek_track(current_position_ms)
-                except:
-                    pass
-            time.sleep(0.5)
-            updated_playback = sp.current_playback()
-            actual_state = updated_playback.get("shuffle_state", new_state) if updated_playback else new_state
-            return {
-                "success": True,
-                "requested_state": int(actual_state),
-                "message": f"Shuffle {'ON' if actual_state else 'OFF'}"
-            }
-        except spotipy.exceptions.SpotifyException as e:
-            if e.http_status == 404:
-                logger.warning(f"Shuffle API error (possibly Smart Shuffle): {e}")
-                if new_state == False:
-                    return {
-                        "success": True,
-                        "requested_state": 0,
-                        "message": "Shuffle OFF"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "Cannot enable shuffle. Smart Shuffle may be active. Please disable it in Spotify app.",
-                        "is_smart_shuffle": True
-                    }
+        sp.shuffle(new_state)
+        job.report(0.4, f"Shuffle {'ON' if new_state else 'OFF'}")
+        current_position_ms = playback.get('progress_ms', 0)
+        if current_position_ms is not None:
+            try:
+                job.sleep(0.3)
+                sp.seek_track(current_position_ms)
+            except spotipy.exceptions.SpotifyException:
+                pass
+        job.sleep(0.5)
+        updated_playback = sp.current_playback()
+        actual_state = updated_playback.get("shuffle_state", new_state) if updated_playback else new_state
+        return {
+            "success": True,
+            "requested_state": int(actual_state),
+            "message": f"Shuffle {'ON' if actual_state else 'OFF'}"
+        }
+    except spotipy.exceptions.SpotifyException as e:
+        if e.http_status == 404:
+            logger.warning(f"Shuffle API error (possibly Smart Shuffle): {e}")
+            if new_state == False:
+                return {
+                    "success": True,
+                    "requested_state": 0,
+                    "message": "Shuffle OFF"
+                }
             else:
-                raise
-    except Exception as e:
-        logger.error(f"Shuffle toggle error: {e}")
-        return {"success": False, "error": str(e)}
+                return {
+                    "success": False,
+                    "error": "Cannot enable shuffle. Smart Shuffle may be active. Please disable it in Spotify app.",
+                    "is_smart_shuffle": True
+                }
+        else:
+            raise
 
 @app.route('/spotify_unlike_track', methods=['POST'])
 @rate_limit(1.0)
@@ -1181,7 +1192,7 @@ def spotify_unlike_track():
 @app.route('/spotify_volume', methods=['POST'])
 @rate_limit(0.5)
 def spotify_volume():
-    if not check_internet_connection(timeout=3):
+    if not health_monitor.is_online():
         return {'success': False, 'error': 'No internet connection'}
     try:
         volume = request.json.get('volume', 50)
@@ -1215,8 +1226,52 @@ def spotify_add_to_queue():
         logger.error(f"Spotify add to queue error: {str(e)}")
         return {'success': False, 'error': str(e)}
 
+def skip_to_track_job(job, track_uri, track_name):
+    logger = logging.getLogger('Launcher')
+    sp, message = get_spotify_client()
+    if not sp:
+        logger.error(f"Spotify client error: {message}")
+        return {'success': False, 'error': message}
+    current_playback = sp.current_playback()
+    if not current_playback:
+        logger.error("No active playback")
+        return {'success': False, 'error': 'No active playback'}
+    current_track = current_playback.get('item')
+    if current_track and current_track.get('uri') == track_uri:
+        logger.info("Track is already playing")
+        return {'success': True, 'message': 'Track is already playing'}
+    try:
+        queue = sp.queue()
+        queue_tracks = queue.get('queue', []) if queue else []
+        found_index = -1
+        for i, queue_track in enumerate(queue_tracks):
+            if queue_track.get('uri') == track_uri:
+                found_index = i
+                break
+        if found_index >= 0:
+            logger.info(f"Track found at position {found_index + 1} in queue")
+            for skipped in range(found_index + 1):
+                job.check_cancelled()
+                sp.next_track()
+                job.report((skipped + 1) / (found_index + 1), f"Skipped {skipped + 1} of {found_index + 1}")
+                job.sleep(0.3)
+            logger.info(f"Skipped to track at position {found_index + 1}")
+            return {
+                'success': True, 
+                'message': f'Now playing "{track_name}"'
+            }
+    except JobCancelled:
+        raise
+    except Exception as e:
+        logger.warning(f"Error checking queue: {e}")
+    logger.info(f"Track not in immediate queue, playing directly")
+    sp.start_playback(uris=[track_uri])
+    return {
+        'success': True, 
+        'message': f'Playing "{track_name}"'
+    }
+
 @app.route('/spotify_skip_to_track', methods=['POST'])
-@rate_limit(0.5)
 def spotify_skip_to_track():
     logger = logging.getLogger('Launcher')
     try:
@@ -1226,44 +1281,7 @@ def spotify_skip_to_track():
             return jsonify({'success': False, 'error': 'No track URI provided'})
         track_name = request.json.get('track_name', 'Unknown Track')
         logger.info(f"Attempting to skip to track: {track_name} ({track_uri})")
-        sp, message = get_spotify_client()
-        if not sp:
-            logger.error(f"Spotify client error: {message}")
-            return jsonify({'success': False, 'error': message})
-        current_playback = sp.current_playback()
-        if not current_playback:
-            logger.error("No active playback")
-            return jsonify({'success': False, 'error': 'No active playback'})
-        current_track = current_playback.get('item')
-        if current_track and current_track.get('uri') == track_uri:
-            logger.info("Track is already playing")
-            return jsonify({'success': True, 'message': 'Track is already playing'})
-        try:
-            queue = sp.queue()
-            queue_tracks = queue.get('queue', []) if queue else []
-            found_index = -1
-            for i, queue_track in enumerate(queue_tracks):
-                if queue_track.get('uri') == track_uri:
-                    found_index = i
-                    break
-            if found_index >= 0:
-                logger.info(f"Track found at position {found_index + 1} in queue")
-                for _ in range(found_index + 1):
-                    sp.next_track()
-                    time.sleep(0.3)
-                logger.info(f"Skipped to track at position {found_index + 1}")
-                return jsonify({
-                    'success': True, 
-                    'message': f'Now playing "{track_name}"'
-                })
-        except Exception as e:
-            logger.warning(f"Error checking queue: {e}")
-        logger.info(f"Track not in immediate queue, playing directly")
-        sp.start_playback(uris=[track_uri])
-        return jsonify({
-            'success': True, 
-            'message': f'Playing "{track_name}"'
-        })
+        return submit_job('skip_to_track', skip_to_track_job, track_uri, track_name)
     except Exception as e:
         logger.error(f"General error in skip_to_track: {e}", exc_info=True)
         return jsonify({'success': False, 'error': f'Error: {str(e)}'})
@@ -1271,8 +1289,8 @@ def spotify_skip_to_track():
 @app.route('/spotify_device_status', methods=['GET'])
 def spotify_device_status():
     try:
-        if os.path.exists('.current_track_state.toml'):
-            state_data = toml.load('.current_track_state.toml')
+        state_data = load_track_state()
+        if state_data:
             device_status = state_data.get('device_status', {})
             if device_status:
                 return {
@@ -1301,8 +1319,8 @@ def spotify_device_status():
 @app.route('/spotify_get_queue', methods=['GET'])
 def spotify_get_queue():
     try:
-        if os.path.exists('.current_track_state.toml'):
-            state_data = toml.load('.current_track_state.toml')
+        state_data = load_track_state()
+        if state_data:
             queue_data = state_data.get('queue', [])
             current_track = state_data.get('current_track', {})
             timestamp = current_track.get('timestamp', 0)
@@ -1327,8 +1345,8 @@ def spotify_get_queue():
 @app.route('/spotify_get_shuffle_state', methods=['GET'])
 def spotify_get_shuffle_state():
     try:
-        if os.path.exists('.current_track_state.toml'):
-            state = toml.load('.current_track_state.toml')
+        state = load_track_state()
+        if state:
             track = state.get("current_track", {})
             timestamp = track.get("timestamp", 0)
             shuffle = track.get("shuffle_state", False)
@@ -1348,8 +1366,8 @@ def spotify_get_shuffle_state():
 @app.route('/spotify_get_volume', methods=['GET'])
 def spotify_get_volume():
     try:
-        if os.path.exists('.current_track_state.toml'):
-            state_data = toml.load('.current_track_state.toml')
+        state_data = load_track_state()
+        if state_data:
             track_data = state_data.get('current_track', {})
             cached_volume = track_data.get('volume_percent')
             if cached_volume is not None:
@@ -1361,129 +1379,51 @@ def spotify_get_volume():
         return jsonify({'success': False, 'error': str(e), 'volume': 50})
 
 @app.route('/spotify_search', methods=['POST'])
-@rate_limit(1.0)
 def spotify_search():
-    config = load_config()
-    ui_config = config.get("ui", {"theme": "dark"})
-    try:
-        query = request.form.get('query', '').strip()
-        if not query:
-            flash('Please enter a search term', 'error')
-            return render_template('search_results.html', 
-                                query='', 
-                                tracks=[],
-                                playlists=[],
-                                ui_config=ui_config)
-        sp, message = get_spotify_client()
-        if not sp:
-            flash(f'Spotify error: {message}', 'error')
-            return render_template('search_results.html', 
-                                query=query, 
-                                tracks=[],
-                                playlists=[],
-                                ui_config=ui_config)
-        results = sp.search(q=query, type='track', limit=20)
-        tracks = []
-        for item in results['tracks']['items']:
-            image_url = None
-            if item['album']['images']:
-                image_url = item['album']['images'][-1]['url'] if item['album']['images'] else None
-            duration_ms = item['duration_ms']
-            duration_min = duration_ms // 60000
-            duration_sec = (duration_ms % 60000) // 1000
-            duration_str = f"{duration_min}:{duration_sec:02d}"
-            artists = ', '.join([artist['name'] for artist in item['artists']])
-            tracks.append({
-                'name': item['name'],
-                'artists': artists,
-                'album': item['album']['name'],
-                'duration': duration_str,
-                'uri': item['uri'],
-                'image_url': image_url
-            })
-        return render_template('search_results.html', 
-                            query=query, 
-                            tracks=tracks,
-                            playlists=[],
-                            ui_config=ui_config)
-    except Exception as e:
-        logger = logging.getLogger('Launcher')
-        logger.error(f"Spotify search error: {str(e)}")
-        flash(f'Search error: {str(e)}', 'error')
-        return render_template('search_results.html', 
-                            query=request.form.get('query', ''), 
-                            tracks=[],
-                            playlists=[],
-                            ui_config=ui_config)
+    return render_spotify_search('tracks', 'Please enter a search term', 'Search error')
 
 @app.route('/spotify_search_playlist', methods=['POST'])
-@rate_limit(1.0)
 def spotify_search_playlist():
+    return render_spotify_search('playlists', 'Please enter a playlist name', 'Playlist search error')
+
+def render_spotify_search(kind, empty_message, error_label):
     config = load_config()
     ui_config = config.get("ui", {"theme": "dark"})
-    logger = logging.getLogger('Launcher')
+    query = request.form.get('query', '').strip()
+    results = {'tracks': [], 'playlists': []}
     try:
-        query = request.form.get('query', '').strip()
         if not query:
-            flash('Please enter a playlist name', 'error')
-            return render_template('search_results.html', 
-                                query='', 
-                                tracks=[],
-                                playlists=[],
-                                ui_config=ui_config)
-        sp, message = get_spotify_client()
-        if not sp:
-            flash(f'Spotify error: {message}', 'error')
-            return render_template('search_results.html', 
-                                query=query, 
-                                tracks=[],
-                                playlists=[],
-                                ui_config=ui_config)
-        results = sp.search(q=query, type='playlist', limit=20)
-        playlists = []
-        if results and 'playlists' in results and results['playlists']['items']:
-            for item in results['playlists']['items']:
-                if not item: continue
-                image_url = None
-                if item['images']:
-                    image_url = item['images'][0]['url']
-                playlists.append({
-                    'name': item['name'],
-                    'owner': item['owner']['display_name'],
-                    'tracks_total': item['tracks']['total'],
-                    'uri': item['uri'],
-                    'image_url': image_url
-                })
-        return render_template('search_results.html', 
-                            query=query, 
-                            tracks=[],
-                            playlists=playlists,
-                            ui_config=ui_config)
+            flash(empty_message, 'error')
+        else:
+            sp, message = get_spotify_client()
+            if not sp:
+                flash(f'Spotify error: {message}', 'error')
+            else:
+                results[kind] = search_service.search(sp, query)[kind]
     except Exception as e:
-        logger.error(f"Spotify playlist search error: {str(e)}")
-        flash(f'Playlist search error: {str(e)}', 'error')
-        return render_template('search_results.html', 
-                            query=request.form.get('query', ''), 
-                            tracks=[],
-                            playlists=[],
-                            ui_config=ui_config)
+        logger = logging.getLogger('Launcher')
+        logger.error(f"Spotify {error_label.lower()}: {str(e)}")
+        flash(f'{error_label}: {str(e)}', 'error')
+    return render_template('search_results.html', 
+                        query=query, 
+                        tracks=results['tracks'],
+                        playlists=results['playlists'],
+                        ui_config=ui_config)
 
 # ============== WEATHER AND DATA ROUTES ==============
 
 @app.route('/api/current_weather')
 def api_current_weather():
     try:
-        weather_file = '.weather_state.toml'
-        if os.path.exists(weather_file):
-            state_data = toml.load(weather_file)
-            weather_data = state_data.get('weather', {})
+        weather_data = load_weather_state()
+        if weather_data:
             timestamp = weather_data.get('timestamp', 0)
             if time.time() - timestamp < 7200:
-                return {
+                return conditional_json(f"weather-{content_etag(weather_data)}", lambda: {
                     'success': True,
                     'weather': weather_data,
                     'timestamp': datetime.now().isoformat()
-                }
+                })
         return {
             'success': True,
             'weather': {
@@ -1509,10 +1449,10 @@ def api_current_track():
     current_track = get_current_track()
     logger = logging.getLogger('Launcher')
     logger.debug(f"API returning track: {current_track.get('song')}, track_id: {current_track.get('track_id')}, is_liked: {current_track.get('is_liked')}")
-    return {
+    return conditional_json(f"track-{content_etag(current_track)}", lambda: {
         'track': current_track,
         'timestamp': datetime.now().isoformat()
-    }
+    })
 # ============== LOG AND STATS ROUTES ==============
 
 @app.route('/clear_logs', methods=['POST'])
@@ -1532,11 +1472,8 @@ def clear_logs():
                     break
             message = f'Backup logs cleared ({backups_cleared} files removed)'
         else:
-            logger = logging.getLogger('Launcher')
-            for handler in logger.handlers[:]:
-                if isinstance(handler, RotatingFileHandler):
-                    handler.close()
-                    logger.removeHandler(handler)
+            if log_pipeline is not None:
+                log_pipeline.stop()
             if os.path.exists(log_file):
                 os.remove(log_file)
             config = load_config()
@@ -1554,7 +1491,10 @@ def clear_logs():
                 '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
             file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            if log_pipeline is not None:
+                log_pipeline.replace_handler(lambda handler: isinstance(handler, RotatingFileHandler), file_handler)
+            else:
+                logging.getLogger('Launcher').addHandler(file_handler)
             message = 'Current log cleared successfully'
         return message, 200
     except Exception as e:
@@ -1565,14 +1505,8 @@ def clear_logs():
 @app.route('/clear_song_logs', methods=['POST'])
 def clear_song_logs():
     try:
-        conn = sqlite3.connect('song_stats.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM song_plays')
-        conn.commit()
-        conn.close()
-        conn = sqlite3.connect('song_stats.db')
-        conn.execute('VACUUM')
-        conn.close()
+        song_db.write(song_stats_db.clear_stats)
+        song_db.write(lambda conn: conn.execute('VACUUM'), transaction=False)
         return jsonify({'success': True, 'message': 'Song logs cleared'}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1605,7 +1539,37 @@ def music_stats_data():
         lines = int(request.args.get('lines', 1000))
     except:
         lines = 1000
-    song_stats, artist_stats, total_plays, unique_songs, unique_artists = generate_music_stats(lines)
+    try:
+        window, since, until = parse_stats_window(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    window_key = f"{window}-{request.args.get('since', '')}-{request.args.get('until', '')}-{time.strftime('%Y-%m-%d')}"
+    return conditional_json(f"stats-{stats_version}-{lines}-{window_key}",
+                            lambda: build_music_stats_data(lines, window, since, until))
+
+STATS_WINDOW_DAYS = {'today': 0, 'week': 6, 'month': 29, 'year': 364}
+
+def parse_stats_window(args):
+    since_arg = args.get('since')
+    until_arg = args.get('until')
+    if since_arg or until_arg:
+        try:
+            since = time.mktime(time.strptime(since_arg, '%Y-%m-%d')) if since_arg else 0
+            until = time.mktime(time.strptime(until_arg, '%Y-%m-%d')) if until_arg else time.time()
+        except ValueError:
+            raise ValueError("since and until must be dates in YYYY-MM-DD format")
+        return 'custom', int(since), int(until)
+    window = args.get('window', 'all')
+    if window == 'all':
+        return window, None, None
+    if window not in STATS_WINDOW_DAYS:
+        raise ValueError(f"Unknown stats window: {window}")
+    now = time.time()
+    return window, int(now - STATS_WINDOW_DAYS[window] * 86400), int(now)
+
+def build_music_stats_data(lines, window='all', since=None, until=None):
+    song_stats, artist_stats, total_plays, unique_songs, unique_artists = generate_music_stats(lines, since, until)
+    hourly_plays, listened_seconds = load_listening_patterns(since, until)
     song_chart_data = generate_chart_data(song_stats, 'Songs')
     artist_chart_data = generate_chart_data(artist_stats, 'Artists')
     song_chart_items = list(zip(song_chart_data['labels'], song_chart_data['data'], song_chart_data['colors']))
@@ -1615,7 +1579,10 @@ def music_stats_data():
         'artist_chart_items': artist_chart_items,
         'total_plays': total_plays,
         'unique_songs': unique_songs,
-        'unique_artists': unique_artists
+        'unique_artists': unique_artists,
+        'hourly_plays': hourly_plays,
+        'listened_seconds': listened_seconds,
+        'window': window
     }
 
 @app.route('/view_logs')
@@ -1640,11 +1607,9 @@ def view_logs():
             ui_config=ui_config,
             backup_count=backup_count
         )
+    log_cursor = ''
     try:
-        with open(log_file, 'r') as f:
-            all_lines = f.readlines()
-            recent_lines = all_lines[-lines:] if lines > 0 else all_lines
-            log_content = ''.join(recent_lines)
+        log_content, log_cursor = log_tail.tail_lines(log_file, lines)
         if not log_content.strip():
             log_content = "Log file exists but is empty. No log messages yet."
     except Exception as e:
@@ -1654,12 +1619,71 @@ def view_logs():
         return log_content
     return render_template('logs.html',
         log_content=log_content,
+        log_cursor=log_cursor,
         lines=lines,
         current_theme=current_theme,
         ui_config=ui_config,
         backup_count=backup_count
     )
 
+@app.route('/logs/recent')
+def logs_recent():
+    if log_pipeline is None:
+        return jsonify({'lines': [], 'sequence': 0, 'suppressed': []})
+    after = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    lines, sequence = log_pipeline.ring_buffer.recent(after, limit)
+    return jsonify({
+        'lines': [line for _, line in lines],
+        'sequence': sequence,
+        'suppressed': log_pipeline.rate_filter.suppression_counts()
+    })
+
+@app.route('/logs/tail')
+def logs_tail():
+    log_file = os.path.join("backuplogs", 'neondisplay.log')
+    lines = request.args.get('lines', 100, type=int)
+    cursor = request.args.get('cursor')
+    try:
+        if cursor:
+            content, cursor, reset = log_tail.read_since(log_file, cursor, initial_lines=lines)
+        else:
+            content, cursor = log_tail.tail_lines(log_file, lines)
+            reset = True
+    except FileNotFoundError:
+        return jsonify({'content': '', 'cursor': '', 'reset': True})
+    except OSError as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'content': content, 'cursor': cursor, 'reset': reset})
+
+@app.route('/stream/logs')
+def stream_logs():
+    log_file = os.path.join("backuplogs", 'neondisplay.log')
+    lines = request.args.get('lines', 100, type=int)
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+    if not log_stream_slots.acquire(blocking=False):
+        return Response("Too many open streams", status=503, headers={'Retry-After': '10'})
+    def generate():
+        nonlocal cursor
+        yield "retry: 5000\n\n"
+        last_sent = time.time()
+        while True:
+            try:
+                content, new_cursor, reset = log_tail.read_since(log_file, cursor, initial_lines=lines)
+            except OSError:
+                content, new_cursor, reset = '', cursor, False
+            if content or reset:
+                cursor = new_cursor
+                last_sent = time.time()
+                yield f"id: {cursor}\n" + state_bus.format_sse({'content': content, 'reset': reset}, event='log')
+            elif time.time() - last_sent >= SSE_KEEPALIVE_INTERVAL:
+                last_sent = time.time()
+                yield ": keepalive\n\n"
+            time.sleep(LOG_STREAM_POLL_INTERVAL)
+    response = Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(log_stream_slots.release)
+    return response
+
 # ============== LYRICS ROUTES ==============
 
 @app.route('/lyrics/current')
@@ -1669,10 +1693,9 @@ def get_current_track_lyrics():
         if not current_track.get('has_track') or current_track.get('song') in ['No track playing', 'Error loading track']:
             return {'success': False, 'error': 'No track currently playing'}
         track_name = current_track['song']
-        artist_name = current_track['artist']
-        if '(' in artist_name:
-            artist_name = artist_name.split('(')[0].strip()
-        result = search_lyrics_for_track(track_name, artist_name)
+        artist_name = lyrics_artist(current_track['artist'])
+        duration = load_track_state().get('current_track', {}).get('duration')
+        result = search_lyrics_for_track(track_name, artist_name, duration)
         return result
     except Exception as e:
         logger = logging.getLogger('Launcher')
@@ -1685,31 +1708,8 @@ def search_lyrics():
     artist_name = request.args.get('artist_name', '').strip()
     if not track_name or not artist_name:
         return {'success': False, 'error': 'Track name and artist name are required'}
-    try:
-        api_url = f"https://lrclib.net/api/search"
-        params = {'track_name': track_name,'artist_name': artist_name}
-        response = requests.get(api_url, params=params, timeout=10)
-        if response.status_code == 200:
-            results = response.json()
-            if results:
-                first_result = results[0]
-                lyrics_id = first_result.get('id')
-                if lyrics_id:
-                    lyrics_response = requests.get(f"https://lrclib.net/api/get/{lyrics_id}", timeout=10)
-                    if lyrics_response.status_code == 200:
-                        lyrics_data = lyrics_response.json()
-                        return {'success': True,'lyrics': lyrics_data.get('syncedLyrics', ''),'plain_lyrics': lyrics_data.get('plainLyrics', ''),'track_name': lyrics_data.get('trackName', track_name),'artist_name': lyrics_data.get('artistName', artist_name),'album_name': lyrics_data.get('albumName', ''),'duration': lyrics_data.get('duration', 0)}
-            return {'success': False, 'error': 'No lyrics found for this track'}
-        else:
-            return {'success': False, 'error': f'API returned status code {response.status_code}'}
-    except requests.RequestException as e:
-        logger = logging.getLogger('Launcher')
-        logger.error(f"Lyrics search error: {e}")
-        return {'success': False, 'error': f'Network error: {str(e)}'}
-    except Exception as e:
-        logger = logging.getLogger('Launcher')
-        logger.error(f"Lyrics search unexpected error: {e}")
-        return {'success': False, 'error': f'Unexpected error: {str(e)}'}
+    duration = request.args.get('duration', type=float)
+    return search_lyrics_for_track(track_name, artist_name, duration)
 
 # ============== MISCELLANEOUS ROUTES ==============
 
@@ -1720,33 +1720,26 @@ def utility_processor():
 @app.route('/current_album_art')
 def current_album_art():
     try:
-        art_path = 'static/current_album_art.jpg'
-        if os.path.exists(art_path):
-            return send_file(art_path, mimetype='image/jpeg')
-        else:
-            from PIL import Image, ImageDraw
-            img = Image.new('RGB', (300, 300), color=(40, 40, 60))
-            draw = ImageDraw.Draw(img)
-            draw.rectangle([10, 10, 290, 290], outline=(100, 100, 150), width=3)
-            draw.text((150, 120), "🎵", fill=(200, 200, 220), anchor="mm")
-            draw.text((150, 180), "No Album Art", fill=(150, 150, 170), anchor="mm")
-            img_io = io.BytesIO()
-            img.save(img_io, 'JPEG', quality=85)
-            img_io.seek(0)
-            return send_file(img_io, mimetype='image/jpeg')
+        art_hash = current_album_art_hash()
+        variant = get_album_art_variant(art_hash or 'placeholder', 300, 'jpg')
+        if variant is None:
+            return "Album art not available", 404
+        response = Response(variant, mimetype='image/jpeg')
+        response.set_etag(art_hash or 'placeholder')
+        return response.make_conditional(request)
     except Exception as e:
         logger = logging.getLogger('Launcher')
         logger.error(f"Error serving album art: {e}")
-        try:
-            error_img = Image.new('RGB', (300, 300), color=(60, 40, 40))
-            draw = ImageDraw.Draw(error_img)
-            draw.text((150, 150), "❌ Error", fill=(220, 150, 150), anchor="mm")
-            img_io = io.BytesIO()
-            error_img.save(img_io, 'JPEG')
-            img_io.seek(0)
-            return send_file(img_io, mimetype='image/jpeg')
-        except:
-            return "Album art not available", 404
+        return "Album art not available", 404
+
+@app.route('/album_art/<art_hash>/<int:size>.<fmt>')
+def album_art_variant(art_hash, size, fmt):
+    variant = get_album_art_variant(art_hash, size, fmt)
+    if variant is None:
+        return "Album art not available", 404
+    response = Response(variant, mimetype=ALBUM_ART_FORMATS[fmt][1])
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 @app.route('/search_results')
 def search_results():
@@ -1777,33 +1770,151 @@ def status_hud():
 def status_neonwifi():
     return {'running': is_neonwifi_running()}
 
+@app.route('/status/http')
+def status_http():
+    return jsonify(http_client.get_stats())
+
 @app.route('/stream/current_track')
 def stream_current_track():
+    subscriber = track_hub.subscribe()
+    if subscriber is None:
+        return Response("Too many open streams", status=503, headers={'Retry-After': '10'})
+    start_event_broadcaster()
+    return sse_response(track_hub, subscriber)
+
+@app.route('/stream/events')
+def stream_events():
+    subscriber = event_hub.subscribe()
+    if subscriber is None:
+        return Response("Too many open streams", status=503, headers={'Retry-After': '10'})
+    start_event_broadcaster()
+    return sse_response(event_hub, subscriber)
+
+@app.route('/jobs')
+def list_jobs():
+    return jsonify({'jobs': job_runner.list()})
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if job_runner.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify({'success': job_runner.cancel(job_id)})
+
+def submit_job(kind, func, *args):
+    try:
+        job = job_runner.submit(kind, func, *args, exclusive=True)
+    except JobBusy as e:
+        return jsonify({'success': False, 'error': 'Already in progress, please wait', 'status': e.job.status}), 429
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status}), 202
+
+def publish_job_update(job):
+    event_hub.publish(state_bus.format_sse(job, event='job'))
+
+def sse_response(hub, subscriber):
     def generate():
-        last_data = None
-        update_counter = 0
-        while True:
-            current_track = get_current_track()
-            track_data = {
-                'song': current_track['song'],
-                'artist': current_track['artist'],
-                'album': current_track['album'],
-                'progress': current_track['progress'],
-                'duration': current_track['duration'],
-                'is_playing': current_track['is_playing'],
-                'has_track': current_track['has_track'],
-                'track_id': current_track.get('track_id', ''),
-                'is_liked': current_track.get('is_liked', False),
-                'timestamp': datetime.now().isoformat()
-            }
-            update_counter += 1
-            if track_data != last_data or update_counter >= 3:
-                if track_data != last_data:
-                    yield f"data: {json.dumps(track_data)}\n\n"
-                    last_data = track_data
-                update_counter = 0
-            time.sleep(2)
-    return Response(generate(), mimetype='text/event-stream')
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = subscriber.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            hub.unsubscribe(subscriber)
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def build_track_event():
+    current_track = get_current_track()
+    return {
+        'song': current_track['song'],
+        'artist': current_track['artist'],
+        'album': current_track['album'],
+        'progress': current_track['progress'],
+        'duration': current_track['duration'],
+        'is_playing': current_track['is_playing'],
+        'has_track': current_track['has_track'],
+        'track_id': current_track.get('track_id', ''),
+        'is_liked': current_track.get('is_liked', False),
+        'art_hash': current_track.get('art_hash')
+    }
+
+def build_state_events():
+    state_data = load_track_state()
+    track_data = state_data.get('current_track', {})
+    device_status = state_data.get('device_status', {})
+    events = {
+        'device': {
+            'success': True,
+            'has_active_device': bool(device_status.get('has_active_device', track_data.get('device_active', False))),
+            'device_name': device_status.get('device_name', track_data.get('device_name', ''))
+        },
+        'volume': {'success': True, 'volume': track_data.get('volume_percent', 50)},
+        'shuffle': {'success': True, 'is_shuffling': bool(track_data.get('shuffle_state', False))},
+        'track': build_track_event(),
+        'queue': {'success': True, 'queue': state_data.get('queue', [])},
+        'stats': {'version': stats_version},
+        'apps': {'hud': is_hud_running(), 'neonwifi': is_neonwifi_running()}
+    }
+    weather_data = load_weather_state()
+    if weather_data and time.time() - weather_data.get('timestamp', 0) < 7200:
+        events['weather'] = {'success': True, 'weather': weather_data}
+    return events
+
+def notify_state_change(topic=None, data=None, version=None):
+    broadcast_wake.set()
+
+def bump_stats_version():
+    global stats_version
+    stats_version += 1
+    notify_state_change()
+
+def event_broadcaster_loop():
+    global event_broadcaster_thread
+    logger = logging.getLogger('Launcher')
+    if state_bus_server is not None:
+        state_bus_server.subscribe(notify_state_change)
+    last_events = {}
+    try:
+        while track_hub.subscriber_count() > 0 or event_hub.subscriber_count() > 0:
+            try:
+                events = build_state_events()
+                for event_type, data in events.items():
+                    if last_events.get(event_type) == data:
+                        continue
+                    last_events[event_type] = data
+                    if event_type == 'track':
+                        data = {**data, 'timestamp': datetime.now().isoformat()}
+                        track_hub.publish(state_bus.format_sse(data), key='track')
+                    event_hub.publish(state_bus.format_sse(data, event=event_type), key=event_type)
+            except Exception as e:
+                logger.error(f"Event broadcaster error: {e}")
+            broadcast_wake.wait(EVENT_BROADCAST_INTERVAL)
+            broadcast_wake.clear()
+    finally:
+        if state_bus_server is not None:
+            state_bus_server.unsubscribe(notify_state_change)
+        with event_broadcaster_lock:
+            event_broadcaster_thread = None
+        if track_hub.subscriber_count() > 0 or event_hub.subscriber_count() > 0:
+            start_event_broadcaster()
+
+def start_event_broadcaster():
+    global event_broadcaster_thread
+    with event_broadcaster_lock:
+        if event_broadcaster_thread is None:
+            event_broadcaster_thread = threading.Thread(target=event_broadcaster_loop, daemon=True)
+            event_broadcaster_thread.start()
 
 # ============== CONFIGURATION FUNCTIONS ==============
     
@@ -1855,7 +1966,7 @@ def validate_google_geo_api_key(api_key):
         return False, "No API key configured"
     url = "https://www.googleapis.com/geolocation/v1/geolocate"
     try:
-        response = requests.post(f"{url}?key={api_key}", json={}, timeout=15)
+        response = http_client.post(f"{url}?key={api_key}", json={}, timeout=15)
         if response.status_code == 200:
             data = response.json()
             accuracy = data.get("accuracy")
@@ -1902,7 +2013,7 @@ def validate_fallback_city_input(city_value, openweather_key):
     if not openweather_key:
         return False, "OpenWeather API key required to validate fallback city", None
     try:
-        response = requests.get(
+        response = http_client.get(
             "http://api.openweathermap.org/geo/1.0/direct",
             params={"q": normalized_value, "limit": 1, "appid": openweather_key},
             timeout=10,
@@ -1969,34 +2080,9 @@ def save_config(config):
 # ============== SPOTIFY FUNCTIONS ==============
 
 def check_spotify_auth(timeout=5):
-    try:
-        from spotify_auth_manager import get_spotify_client
-        result = [False, "Checking..."]
-        def check():
-            try:
-                sp = get_spotify_client(timeout=timeout)
-                if not sp:
-                    result[0] = False
-                    result[1] = "Could not get Spotify client"
-                    return
-                user = sp.current_user()
-                result[0] = True
-                result[1] = f"Authenticated as {user.get('display_name', 'Unknown User')}"
-            except Exception as e:
-                logger = logging.getLogger('Launcher')
-                logger.error(f"Error checking Spotify auth: {e}")
-                result[0] = False
-                result[1] = f"Authentication error: {str(e)}"
-        thread = threading.Thread(target=check, daemon=True)
-        thread.start()
-        thread.join(timeout=timeout)
-        if thread.is_alive():
-            return False, "Authentication check timeout"
-        return result[0], result[1]
-    except Exception as e:
-        logger = logging.getLogger('Launcher')
-        logger.error(f"Error checking Spotify auth: {e}")
-        return False, f"Authentication error: {str(e)}"
+    if not health_monitor.wait_ready(timeout):
+        return False, "Authentication check timeout"
+    return health_monitor.spotify_auth()
 
 def get_spotify_client(timeout=5):
     config = load_config()
@@ -2014,172 +2100,65 @@ def get_spotify_client(timeout=5):
         return None, f"Client creation failed: {str(e)}"
 
 def safe_check_spotify_auth(timeout=3):
-    if not check_internet_connection(timeout=2):
+    if not health_monitor.is_online():
         return False, "No internet connection"
     return check_spotify_auth(timeout=timeout)
 
 
 # ============== PROCESS MANAGEMENT FUNCTIONS ==============
 
+def handle_hud_output(line):
+    logger = logging.getLogger('Launcher')
+    logger.info(f"[HUD] {line.strip()}")
+
+def handle_neonwifi_output(line):
+    logger = logging.getLogger('Launcher')
+    logger.info(f"[neonwifi] {line.strip()}")
+
+def handle_process_state_change(name, running):
+    logger = logging.getLogger('Launcher')
+    logger.info(f"{name} is now {'running' if running else 'stopped'}")
+    notify_state_change()
+
+def init_process_supervisors():
+    global hud_supervisor, neonwifi_supervisor
+    logger = logging.getLogger('Launcher')
+    hud_supervisor = ProcessSupervisor('HUD', [sys.executable, 'hud.py'], '.hud.pid',
+                                       on_output=handle_hud_output, on_state_change=handle_process_state_change, logger=logger)
+    neonwifi_supervisor = ProcessSupervisor('neonwifi', [sys.executable, 'neonwifi.py'], '.neonwifi.pid',
+                                            on_output=handle_neonwifi_output, on_state_change=handle_process_state_change, logger=logger)
+
 def is_hud_running():
-    global hud_process
-    if hud_process is not None:
-        if hud_process.poll() is None:
-            result = True
-        else:
-            hud_process = None
-            result = False
-    else:
-        try:
-            result = bool(subprocess.run(['pgrep', '-f', 'hud.py'], 
-                            capture_output=True, text=True).stdout.strip())
-        except Exception:
-            result = False
-    return result
+    return hud_supervisor is not None and hud_supervisor.is_running()
 
 def is_neonwifi_running():
-    global neonwifi_process
-    if neonwifi_process is not None:
-        if neonwifi_process.poll() is None:
-            return True
-        else:
-            neonwifi_process = None
-    try:
-        result = subprocess.run(['pgrep', '-f', 'neonwifi.py'], 
-                            capture_output=True, text=True)
-        return bool(result.stdout.strip())
-    except Exception:
-        return False
+    return neonwifi_supervisor is not None and neonwifi_supervisor.is_running()
 
 def start_hud():
-    global hud_process, last_logged_song
-    logger = logging.getLogger('Launcher')
-    if is_hud_running():
-        return False, "HUD is already running"
-    try:
-        hud_process = subprocess.Popen(
-            [sys.executable, 'hud.py'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        def log_hud_output():
-            for line in iter(hud_process.stdout.readline, ''):
-                if line.strip():
-                    logger.info(f"[HUD] {line.strip()}")
-                    song_info = parse_song_from_log(line)
-                    if song_info:
-                        update_song_count(song_info)
-        def monitor_current_track_state():
-            while hud_process and hud_process.poll() is None:
-                log_current_track_state()
-                time.sleep(2)
-        output_thread = threading.Thread(target=log_hud_output)
-        output_thread.daemon = True
-        output_thread.start()
-        track_monitor_thread = threading.Thread(target=monitor_current_track_state)
-        track_monitor_thread.daemon = True
-        track_monitor_thread.start()
-        time.sleep(2)
-        if hud_process.poll() is None:
-            return True, "HUD started successfully"
-        else:
-            return False, "HUD failed to start (check neondisplay.log for details)"
-    except Exception as e:
-        logger.error(f"Error starting HUD: {str(e)}")
-        return False, f"Error starting HUD: {str(e)}"
+    return hud_supervisor.start()
 
 def stop_hud():
-    global hud_process, last_logged_song
     logger = logging.getLogger('Launcher')
-    if not is_hud_running():
-        return False, "HUD is not running"
-    try:
-        logger.info("Stopping HUD...")
-        hud_process.terminate()
-        try:
-            hud_process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            hud_process.kill()
-            hud_process.wait()
-        hud_process = None
-        last_logged_song = None
+    logger.info("Stopping HUD...")
+    success, message = hud_supervisor.stop()
+    if success:
         clear_track_state_file()
-        logger.info("HUD stopped successfully")
-        return True, "HUD stopped successfully"
-    except Exception as e:
-        logger.error(f"Error stopping HUD: {str(e)}")
-        return False, f"Error stopping HUD: {str(e)}"
+        logger.info(message)
+    return success, message
 
 def start_neonwifi():
-    global neonwifi_process
-    logger = logging.getLogger('Launcher')
-    if is_neonwifi_running():
-        return False, "neonwifi is already running"
-    try:
-        neonwifi_process = subprocess.Popen(
-            [sys.executable, 'neonwifi.py'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        def log_neonwifi_output():
-            for line in iter(neonwifi_process.stdout.readline, ''):
-                if line.strip():
-                    logger.info(f"[neonwifi] {line.strip()}")
-        output_thread = threading.Thread(target=log_neonwifi_output)
-        output_thread.daemon = True
-        output_thread.start()
-        time.sleep(3)
-        if neonwifi_process.poll() is None:
-            return True, "neonwifi started successfully"
-        else:
-            return False, "neonwifi failed to start (check neondisplay.log for details)"
-    except Exception as e:
-        logger.error(f"Error starting neonwifi: {str(e)}")
-        return False, f"Error starting neonwifi: {str(e)}"
+    return neonwifi_supervisor.start()
 
 def stop_neonwifi():
-    global neonwifi_process
     logger = logging.getLogger('Launcher')
-    if not is_neonwifi_running():
-        return False, "neonwifi is not running"
-    try:
-        logger.info("Stopping neonwifi...")
-        if neonwifi_process:
-            neonwifi_process.terminate()
-            try:
-                neonwifi_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                neonwifi_process.kill()
-                neonwifi_process.wait()
-            neonwifi_process = None
-        subprocess.run(['pkill', '-f', 'neonwifi.py'], check=False)
-        time.sleep(2)
-        logger.info("neonwifi stopped successfully")
-        return True, "neonwifi stopped successfully"
-    except Exception as e:
-        logger.error(f"Error stopping neonwifi: {str(e)}")
-        return False, f"Error stopping neonwifi: {str(e)}"
+    logger.info("Stopping neonwifi...")
+    success, message = neonwifi_supervisor.stop()
+    if success:
+        logger.info(message)
+    return success, message
 
 # ============== NETWORK FUNCTIONS ==============
 
-def check_internet_connection(timeout=5):
-    try:
-        response = requests.get("http://www.google.com", timeout=timeout)
-        return response.status_code == 200
-    except requests.RequestException:
-        try:
-            import socket
-            socket.create_connection(("8.8.8.8", 53), timeout=timeout)
-            return True
-        except socket.error:
-            return False
-
 def wait_for_internet(timeout=60, check_interval=5):
     logger = logging.getLogger('Launcher')
     logger.info("🔍 Waiting for internet connection...")
@@ -2248,6 +2227,7 @@ def restart_processes_after_config():
 # ============== LOGGING FUNCTIONS ==============
 
 def setup_logging():
+    global log_pipeline
     logging.getLogger().handlers = []
     logger = logging.getLogger('Launcher')
     logger.handlers = []
@@ -2258,10 +2238,15 @@ def setup_logging():
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    config = load_config()
+    log_config = config.get("logging", {})
+    log_pipeline = LogPipeline([console_handler], RateLimitFilter(
+        rate=log_config.get("rate_limit_messages", 5),
+        per=log_config.get("rate_limit_window", 10)
+    ))
+    log_pipeline.ring_buffer.setFormatter(formatter)
+    log_pipeline.attach(logger)
     try:
-        config = load_config()
-        log_config = config.get("logging", {})
         max_lines = log_config.get("max_log_lines", 10000)
         max_bytes = max_lines * 100  
         backup_count = log_config.get("max_backup_files", 5)
@@ -2274,7 +2259,7 @@ def setup_logging():
         )
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        log_pipeline.replace_handler(lambda handler: isinstance(handler, RotatingFileHandler), file_handler)
         log_file_path = os.path.join(backup_folder, 'neondisplay.log')
         if not os.path.exists(log_file_path) or os.path.getsize(log_file_path) == 0:
             with open(log_file_path, 'a') as f:
@@ -2320,40 +2305,133 @@ def count_backup_logs():
         logger.error(f"Error counting backup logs: {e}")
     return count
 
-# ============== MUSIC TRACKING FUNCTIONS ==============
+# ============== STATE FUNCTIONS ==============
 
-def parse_song_from_log(log_line):
-    if 'Now playing:' in log_line:
+def load_track_state():
+    state_data = {}
+    if state_bus_server is not None:
+        for key in ('current_track', 'device_status', 'queue'):
+            value = state_bus_server.get(key)
+            if value is not None:
+                state_data[key] = value
+    if len(state_data) < 3:
         try:
-            if '🎵 Now playing:' in log_line:
-                song_part = log_line.split('🎵 Now playing: ')[1].strip()
-            else:
-                song_part = log_line.split('Now playing: ')[1].strip()
-            separators = [' -- ', ' - ', ' – ']
-            artist_part = 'Unknown Artist'
-            song = song_part
-            for separator in separators:
-                if separator in song_part:
-                    artist_part, song = song_part.split(separator, 1)
-                    break
-            artists = []
-            if artist_part != 'Unknown Artist':
-                artists = [artist.strip() for artist in artist_part.split(',')]
-                artists = [artist for artist in artists if artist]
-            if not artists:
-                artists = ['Unknown Artist']
-                artist_part = 'Unknown Artist'
-            return {
-                'song': song.strip(),
-                'artist': artist_part.strip(),
-                'artists': artists,
-                'full_track': f"{artist_part} -- {song}".strip()
-            }
+            file_state = state_file_cache.get('.current_track_state.toml', {})
         except Exception as e:
             logger = logging.getLogger('Launcher')
-            logger.error(f"Error parsing song from log: {e}")
-            return None
-    return None
+            logger.error(f"Error reading track state file: {e}")
+            file_state = {}
+        track_from_file = 'current_track' not in state_data
+        for key, value in file_state.items():
+            state_data.setdefault(key, value)
+        if track_from_file and 'current_track' in state_data:
+            merge_track_progress(state_data)
+    return state_data
+
+def get_progress_state_file():
+    global progress_state_file
+    if progress_state_file is None:
+        config = load_config()
+        directory = config.get("settings", {}).get("volatile_state_dir", DEFAULT_CONFIG["settings"]["volatile_state_dir"])
+        progress_state_file = state_bus.volatile_state_path(directory, state_bus.PROGRESS_STATE_NAME)
+    return progress_state_file
+
+def merge_track_progress(state_data):
+    try:
+        progress = state_file_cache.get(get_progress_state_file(), {}).get('progress', {})
+    except Exception:
+        return
+    current_track = state_data.get('current_track')
+    if current_track is not None and progress.get('timestamp', 0) >= current_track.get('timestamp', 0):
+        state_data['current_track'] = {**current_track, **progress}
+
+def load_weather_state():
+    if state_bus_server is not None:
+        weather_data = state_bus_server.get('weather')
+        if weather_data is not None:
+            return weather_data
+    try:
+        return state_file_cache.get('.weather_state.toml', {}).get('weather', {})
+    except Exception as e:
+        logger = logging.getLogger('Launcher')
+        logger.error(f"Error reading weather state file: {e}")
+    return {}
+
+def start_state_bus():
+    global state_bus_server
+    logger = logging.getLogger('Launcher')
+    try:
+        state_bus_server = state_bus.StateBusServer()
+        state_bus_server.start()
+        logger.info(f"📡 State bus listening on {state_bus_server.path}")
+    except OSError as e:
+        state_bus_server = None
+        logger.error(f"State bus unavailable, falling back to state files: {e}")
+
+# ============== ALBUM ART FUNCTIONS ==============
+
+def read_album_art_file(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return {'hash': hashlib.sha1(data).hexdigest()[:16], 'data': data}
+
+def encode_album_art_variant(data, size, fmt):
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    resized = image.resize((size, size), Image.LANCZOS)
+    output = io.BytesIO()
+    resized.save(output, ALBUM_ART_FORMATS[fmt][0], quality=85)
+    return output.getvalue()
+
+def render_placeholder_art():
+    img = Image.new('RGB', (300, 300), color=(40, 40, 60))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([10, 10, 290, 290], outline=(100, 100, 150), width=3)
+    draw.text((150, 120), "🎵", fill=(200, 200, 220), anchor="mm")
+    draw.text((150, 180), "No Album Art", fill=(150, 150, 170), anchor="mm")
+    output = io.BytesIO()
+    img.save(output, 'PNG')
+    return output.getvalue()
+
+def current_album_art_hash():
+    global album_art_files
+    with album_art_lock:
+        if album_art_files is None:
+            album_art_files = state_bus.StateFileCache(read_album_art_file)
+    entry = album_art_files.get(ALBUM_ART_PATH)
+    if not entry:
+        return None
+    with album_art_lock:
+        if entry['hash'] not in album_art_sources:
+            album_art_sources[entry['hash']] = entry['data']
+            while len(album_art_sources) > MAX_CACHED_ALBUM_ART:
+                evicted, _ = album_art_sources.popitem(last=False)
+                for key in [key for key in album_art_variants if key[0] == evicted]:
+                    del album_art_variants[key]
+    return entry['hash']
+
+def get_album_art_variant(art_hash, size, fmt):
+    if size not in ALBUM_ART_SIZES or fmt not in ALBUM_ART_FORMATS:
+        return None
+    key = (art_hash, size, fmt)
+    with album_art_lock:
+        variant = album_art_variants.get(key)
+        if variant is not None:
+            return variant
+        if art_hash == 'placeholder':
+            data = None
+        else:
+            data = album_art_sources.get(art_hash)
+            if data is None:
+                return None
+    if data is None:
+        data = render_placeholder_art()
+    variant = encode_album_art_variant(data, size, fmt)
+    with album_art_lock:
+        if art_hash == 'placeholder' or art_hash in album_art_sources:
+            album_art_variants[key] = variant
+    return variant
+
+# ============== MUSIC TRACKING FUNCTIONS ==============
 
 def get_current_track():
     try:
@@ -2369,9 +2447,8 @@ def get_current_track():
                 'track_id': '',
                 'is_liked': False
             }
-        state_file = '.current_track_state.toml'
-        if os.path.exists(state_file):
-            state_data = toml.load(state_file)
+        state_data = load_track_state()
+        if state_data:
             track_data = state_data.get('current_track', {})
             timestamp = track_data.get('timestamp', 0)
             logger = logging.getLogger('Launcher')
@@ -2402,8 +2479,7 @@ def get_current_track():
                     'has_track': track_data.get('title') != 'No track playing',
                     'track_id': track_data.get('track_id', ''),
                     'is_liked': track_data.get('is_liked', False),
-                    'track_id': track_data.get('track_id', ''),
-                    'is_liked': track_data.get('is_liked', False)
+                    'art_hash': current_album_art_hash()
                 }
         return {
             'song': 'No track playing',
@@ -2434,285 +2510,140 @@ def get_current_track():
 def clear_track_state_file():
     logger = logging.getLogger('Launcher')
     try:
+        empty_state = {
+            'current_track': {
+                'title': 'No track playing',
+                'artists': '',
+                'album': '',
+                'current_position': 0,
+                'duration': 0,
+                'is_playing': False,
+                'timestamp': time.time()
+            }
+        }
+        if state_bus_server is not None:
+            state_bus_server.publish('current_track', empty_state['current_track'])
+            state_bus_server.clear('device_status')
+            state_bus_server.clear('queue')
         if os.path.exists('.current_track_state.toml'):
             with open('.current_track_state.toml', 'w') as f:
-                empty_state = {
-                    'current_track': {
-                        'title': 'No track playing',
-                        'artists': '',
-                        'album': '',
-                        'current_position': 0,
-                        'duration': 0,
-                        'is_playing': False,
-                        'timestamp': time.time()
-                    }
-                }
                 toml.dump(empty_state, f)
             logger.info("Cleared current track state")
     except Exception as e:
         logger.error(f"Error clearing track state: {e}")
 
-def get_last_logged_song():
-    if not os.path.exists('songs.toml'):
-        return None
-    try:
-        with open('songs.toml', 'r') as f:
-            content = f.read()
-        data = toml.loads(content)
-        plays = data.get('play', [])
-        if not plays:
-            return None
-        last_play = plays[-1]
-        return last_play.get('full_track')
-    except Exception as e:
-        logger = logging.getLogger('Launcher')
-        logger.error(f"Error reading last logged song: {e}")
-        return None
-
 # ============== SONG DATABASE FUNCTIONS ==============
 
 def init_song_database():
-    conn = sqlite3.connect('song_stats.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS song_plays (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            song_hash TEXT UNIQUE,
-            song_data TEXT,
-            play_count INTEGER DEFAULT 0,
-            last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_count ON song_plays(play_count)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_hash ON song_plays(song_hash)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_last_played ON song_plays(last_played)')
-    conn.commit()
-    return conn
-song_db_conn = init_song_database()
-
-def backup_db_if_needed():
-    try:
-        MAX_BACKUPS = 3
-        BACKUP_INTERVAL = 1200
-        backup_1 = 'song_stats.db.backup.1'
-        should_backup = False
-        if not os.path.exists(backup_1):
-            should_backup = True
-        elif (time.time() - os.path.getmtime(backup_1)) > BACKUP_INTERVAL:
-            should_backup = True
-        if should_backup and os.path.exists('song_stats.db'):
-            logger = logging.getLogger('Launcher')
-            backup_3 = 'song_stats.db.backup.3'
-            backup_2 = 'song_stats.db.backup.2'
-            if os.path.exists(backup_3):
-                os.remove(backup_3)
-            if os.path.exists(backup_2):
-                shutil.move(backup_2, backup_3)
-                logger.info(f"🔄 Rotated backup.2 -> backup.3")
-            if os.path.exists(backup_1):
-                shutil.move(backup_1, backup_2)
-                logger.info(f"🔄 Rotated backup.1 -> backup.2")
-            shutil.copy2('song_stats.db', backup_1)
-            logger.info(f"✅ Database backed up to {backup_1}")
-    except Exception as e:
-        logger = logging.getLogger('Launcher')
-        logger.error(f"❌ Database backup failed: {e}")
+    song_db.logger = logging.getLogger('Launcher')
+    song_db.start()
+    song_db.start_backups()
+
+def handle_bus_message(topic, data, version):
+    if topic == 'play_event' and isinstance(data, dict) and data.get('id'):
+        play_events.put(data)
 
-def update_song_count(song_info):
-    global last_logged_song
+def play_event_loop():
     logger = logging.getLogger('Launcher')
-    current_song = song_info.get('full_track', '').strip()
-    if last_logged_song and current_song == last_logged_song:
-        return
-    if not hasattr(update_song_count, 'lock'):
-        update_song_count.lock = threading.Lock()
-    with update_song_count.lock:
+    seen = collections.OrderedDict()
+    while True:
+        batch = [play_events.get()]
+        while len(batch) < PLAY_EVENT_BATCH_SIZE:
+            try:
+                batch.append(play_events.get(timeout=PLAY_EVENT_BATCH_WAIT))
+            except queue.Empty:
+                break
+        fresh = []
+        for event in batch:
+            if event['id'] in seen:
+                continue
+            seen[event['id']] = True
+            if len(seen) > PLAY_EVENT_SEEN_SIZE:
+                seen.popitem(last=False)
+            fresh.append(event)
+            if event.get('type') == 'threshold':
+                logger.info(f"🎵 Logged play: {', '.join(event.get('artists') or [])} -- {event.get('title')}")
+        if not any(event.get('type') in ('threshold', 'end', 'skip') for event in fresh):
+            continue
+        def job(conn, events=fresh):
+            for event in events:
+                song_stats_db.apply_play_event(conn, event)
         try:
-            conn = sqlite3.connect('song_stats.db', check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS song_plays (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    song_hash TEXT UNIQUE,
-                    song_data TEXT,
-                    play_count INTEGER DEFAULT 0,
-                    last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_count ON song_plays(play_count)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_hash ON song_plays(song_hash)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_last_played ON song_plays(last_played)')
-            if not song_info or not current_song:
-                conn.close()
-                return
-            song_hash = hashlib.md5(current_song.encode('utf-8')).hexdigest()[:16]
-            cursor.execute('''
-                INSERT INTO song_plays (song_hash, song_data, play_count, last_played)
-                VALUES (?, ?, 1, datetime('now'))
-                ON CONFLICT(song_hash) DO UPDATE SET 
-                play_count = play_count + 1,
-                last_played = datetime('now')
-            ''', (song_hash, current_song))
-            conn.commit()
-            conn.close()
-            backup_db_if_needed()
-            last_logged_song = current_song
+            song_db.submit(job)
         except Exception as e:
-            logger.error(f"Error updating song count: {e}")
-            try:
-                conn.close()
-            except:
-                pass
+            logger.error(f"Error recording play events: {e}")
 
-def log_current_track_state():
-    global last_logged_song
-    try:
-        if not os.path.exists('.current_track_state.toml'):
-            return
-        state_data = toml.load('.current_track_state.toml')
-        track_data = state_data.get('current_track', {})
-        if not track_data.get('title') or track_data.get('title') in ['No track playing', 'Unknown Track']:
-            return
-        current_position = track_data.get('current_position', 0)
-        duration = track_data.get('duration', 1)
-        if duration > 0 and (current_position / duration) < 0.1:
-            return        
-        artists_data = track_data.get('artists', '')
-        artists_list = []
-        if isinstance(artists_data, list):
-            artists_list = [str(artist).strip() for artist in artists_data if artist and str(artist).strip()]
-        elif isinstance(artists_data, str) and artists_data.strip():
-            artists_list = [artist.strip() for artist in artists_data.split(',') if artist.strip()]
-        if not artists_list:
-            artists_list = ['Unknown Artist']
-        artist_str = ', '.join(artists_list)
-        current_song = f"{artist_str} -- {track_data.get('title', '')}".strip()
-        if last_logged_song and current_song == last_logged_song:
-            return
-        song_info = {
-            'song': track_data.get('title', ''),
-            'artist': artist_str,
-            'artists': artists_list,
-            'full_track': current_song
-        }
-        update_song_count(song_info)
-    except Exception as e:
+def start_play_event_consumer():
+    global play_event_thread
+    if play_event_thread is not None:
+        return
+    if state_bus_server is None:
         logger = logging.getLogger('Launcher')
-        logger.error(f"Error logging from current track state: {e}")
+        logger.error("❌ State bus unavailable, play events cannot be received: song stats recording is disabled")
+        return
+    state_bus_server.subscribe(handle_bus_message)
+    play_event_thread = threading.Thread(target=play_event_loop, daemon=True)
+    play_event_thread.start()
 
 def load_song_counts():
     try:
-        conn = sqlite3.connect('song_stats.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS song_plays (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                song_hash TEXT UNIQUE,
-                song_data TEXT,
-                play_count INTEGER DEFAULT 0,
-                last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute('''
-            SELECT song_data, play_count 
-            FROM song_plays 
-            ORDER BY play_count DESC, last_played DESC
-            LIMIT 1000
-        ''')
-        result = dict(cursor.fetchall())
-        conn.close()
-        return result
+        with song_db.read() as conn:
+            return dict(song_stats_db.top_tracks(conn, 1000))
     except Exception as e:
         logger = logging.getLogger('Launcher')
         logger.error(f"Error loading song counts: {e}")
-        try:
-            conn.close()
-        except:
-            pass
         return {}
 
-def generate_music_stats(max_items=1000):
-    try:
-        conn = sqlite3.connect('song_stats.db', check_same_thread=False)
-        cursor = conn.cursor()
-        cursor.execute('SELECT SUM(play_count), COUNT(*) FROM song_plays')
-        total_plays, unique_songs = cursor.fetchone()
-        total_plays = total_plays or 0
-        cursor.execute('''
-            SELECT song_data, play_count 
-            FROM song_plays 
-            ORDER BY play_count DESC, last_played DESC
-            LIMIT ?
-        ''', (max_items,))
-        song_stats = {}
-        for song_data, play_count in cursor.fetchall():
-            song_stats[song_data] = play_count
-        cursor.execute('SELECT song_data, play_count FROM song_plays')
-        artist_stats = {}
-        all_artists_set = set()
-        for song_data, play_count in cursor.fetchall():
-            if ' -- ' in song_data:
-                artist_part = song_data.split(' -- ')[0].strip()
-                artists = [artist.strip() for artist in artist_part.split(',')]
-                for artist in artists:
-                    if artist:
-                        artist_stats[artist] = artist_stats.get(artist, 0) + play_count
-                        all_artists_set.add(artist)
+def generate_music_stats(max_items=1000, since=None, until=None):
+    try:
+        with song_db.read() as conn:
+            if since is None:
+                song_stats = dict(song_stats_db.top_tracks(conn, max_items))
+                artist_stats = dict(song_stats_db.top_artists(conn, max_items))
+                total_plays, unique_songs, unique_artists = song_stats_db.totals(conn)
             else:
-                unknown_artist = 'Unknown Artist'
-                artist_stats[unknown_artist] = artist_stats.get(unknown_artist, 0) + play_count
-                all_artists_set.add(unknown_artist)
-        sorted_artists = sorted(artist_stats.items(), key=lambda x: x[1], reverse=True)
-        artist_stats = dict(sorted_artists[:max_items])
-        unique_artists = len(all_artists_set)
-        conn.close()
+                song_stats = dict(song_stats_db.top_tracks_between(conn, since, until, max_items))
+                artist_stats = dict(song_stats_db.top_artists_between(conn, since, until, max_items))
+                total_plays, unique_songs, unique_artists, _ = song_stats_db.totals_between(conn, since, until)
         return song_stats, artist_stats, total_plays, unique_songs, unique_artists
     except Exception as e:
         logger = logging.getLogger('Launcher')
         logger.error(f"Error generating music stats: {e}")
-        try:
-            conn.close()
-        except:
-            pass
         return {}, {}, 0, 0, 0
 
+def load_listening_patterns(since=None, until=None):
+    try:
+        with song_db.read() as conn:
+            hourly_plays = song_stats_db.plays_by_hour(conn, since, until)
+            listened_seconds = song_stats_db.totals_between(conn, since or 0, until or time.time())[3]
+        return hourly_plays, listened_seconds
+    except Exception as e:
+        logger = logging.getLogger('Launcher')
+        logger.error(f"Error loading listening patterns: {e}")
+        return [0] * 24, 0
+
 # ============== CLEANUP AND SIGNAL HANDLING ==============
 
 def cleanup():
     logger = logging.getLogger('Launcher')
-    global hud_process, neonwifi_process
     logger.info("🧹 Performing cleanup...")
-    functions_with_conn = [update_song_count, load_song_counts, generate_music_stats]
-    for func in functions_with_conn:
-        if hasattr(func, 'db_conn'):
-            try:
-                func.db_conn.close()
-                logger.info(f"Closed database connection for {func.__name__}")
-            except Exception as e:
-                logger.error(f"Error closing database connection for {func.__name__}: {e}")
-    if hud_process and hud_process.poll() is None:
-        logger.info("Stopping HUD process...")
-        hud_process.terminate()
-        try:
-            hud_process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            logger.warning("HUD didn't terminate gracefully, killing...")
-            hud_process.kill()
-            hud_process.wait()
-        hud_process = None
-    if neonwifi_process and neonwifi_process.poll() is None:
-        logger.info("Stopping neonwifi process...")
-        neonwifi_process.terminate()
-        try:
-            neonwifi_process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            logger.warning("neonwifi didn't terminate gracefully, killing...")
-            neonwifi_process.kill()
-            neonwifi_process.wait()
-        neonwifi_process = None
+    job_runner.shutdown()
+    try:
+        song_db.close()
+        logger.info("Closed song stats database")
+    except Exception as e:
+        logger.error(f"Error closing song stats database: {e}")
+    for supervisor in (hud_supervisor, neonwifi_supervisor):
+        if supervisor is not None and supervisor.is_running():
+            logger.info(f"Stopping {supervisor.name} process...")
+            supervisor.stop()
     subprocess.run(['pkill', '-f', 'hud.py'], check=False, timeout=5)
     subprocess.run(['pkill', '-f', 'neonwifi.py'], check=False, timeout=5)
+    if state_bus_server is not None:
+        state_bus_server.stop()
     logger.info("Cleanup completed")
+    if log_pipeline is not None:
+        log_pipeline.stop()
 
 def signal_handler(sig, frame):
     logger = logging.getLogger('Launcher')
@@ -2729,6 +2660,14 @@ def main():
     logger = setup_logging()
     logger.info("🚀 Starting HUD Launcher")
     init_song_database()
+    start_token_refresher()
+    start_state_bus()
+    start_play_event_consumer()
+    start_lyrics_prefetcher()
+    init_process_supervisors()
+    health_monitor.logger = logger
+    health_monitor.start()
+    job_runner.logger = logger
     def get_lan_ips():
         ips = []
         try:
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import os, time, select, signal, subprocess, threading
+
+STARTUP_GRACE = 1.0
+STOP_TIMEOUT = 5
+STABLE_RUN_SECONDS = 30
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+ADOPTED_POLL_INTERVAL = 2
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _pid_cmdline(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+class ProcessSupervisor:
+    def __init__(self, name, command, pidfile, on_output=None, on_state_change=None, restart=True, logger=None):
+        self.name = name
+        self.command = command
+        self.pidfile = pidfile
+        self.on_output = on_output
+        self.on_state_change = on_state_change
+        self.restart = restart
+        self.logger = logger
+        self._lock = threading.RLock()
+        self._process = None
+        self._pid = None
+        self._running = False
+        self._stopping = False
+        self._exited = threading.Event()
+        self._restart_timer = None
+        self._failures = 0
+        self._started_at = 0
+        self._adopt_existing()
+
+    def _log(self, level, message):
+        if self.logger is not None:
+            getattr(self.logger, level)(message)
+
+    def _write_pidfile(self, pid):
+        try:
+            with open(self.pidfile, 'w') as f:
+                f.write(str(pid))
+        except OSError as e:
+            self._log('warning', f"Could not write {self.pidfile}: {e}")
+
+    def _remove_pidfile(self):
+        try:
+            os.remove(self.pidfile)
+        except OSError:
+            pass
+
+    def _script_name(self):
+        return os.path.basename(self.command[-1])
+
+    def _adopt_existing(self):
+        try:
+            with open(self.pidfile, 'r') as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return
+        if not _pid_alive(pid) or self._script_name() not in _pid_cmdline(pid):
+            self._remove_pidfile()
+            return
+        self._log('info', f"Adopting running {self.name} (pid {pid}); its output is not captured until it is restarted")
+        self._pid = pid
+        self._set_running(True)
+        self._exited.clear()
+        threading.Thread(target=self._watch_adopted, args=(pid,), daemon=True).start()
+
+    def _set_running(self, running):
+        with self._lock:
+            changed = self._running != running
+            self._running = running
+        if changed and self.on_state_change is not None:
+            try:
+                self.on_state_change(self.name, running)
+            except Exception as e:
+                self._log('error', f"{self.name} state callback error: {e}")
+
+    def is_running(self):
+        return self._running
+
+    @property
+    def pid(self):
+        return self._pid
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return False, f"{self.name} is already running"
+            self._cancel_restart()
+            self._stopping = False
+            try:
+                self._spawn()
+            except Exception as e:
+                self._log('error', f"Error starting {self.name}: {e}")
+                return False, f"Error starting {self.name}: {str(e)}"
+        if self._exited.wait(STARTUP_GRACE):
+            return False, f"{self.name} failed to start (check neondisplay.log for details)"
+        return True, f"{self.name} started successfully"
+
+    def _spawn(self):
+        process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self._process = process
+        self._pid = process.pid
+        self._started_at = time.time()
+        self._exited.clear()
+        self._write_pidfile(process.pid)
+        self._set_running(True)
+        threading.Thread(target=self._read_output, args=(process,), daemon=True).start()
+        threading.Thread(target=self._watch_child, args=(process,), daemon=True).start()
+
+    def _read_output(self, process):
+        for line in iter(process.stdout.readline, ''):
+            if line.strip() and self.on_output is not None:
+                try:
+                    self.on_output(line)
+                except Exception as e:
+                    self._log('error', f"{self.name} output handler error: {e}")
+
+    def _watch_child(self, process):
+        returncode = process.wait()
+        self._handle_exit(process.pid, returncode)
+
+    def _watch_adopted(self, pid):
+        pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(pid)
+            except OSError:
+                pidfd = None
+        try:
+            if pidfd is not None:
+                poller = select.poll()
+                poller.register(pidfd, select.POLLIN)
+                poller.poll()
+            else:
+                while _pid_alive(pid):
+                    time.sleep(ADOPTED_POLL_INTERVAL)
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+        self._handle_exit(pid, None)
+
+    def _handle_exit(self, pid, returncode):
+        with self._lock:
+            if pid != self._pid:
+                return
+            self._process = None
+            self._pid = None
+            stopping = self._stopping
+            ran_for = time.time() - self._started_at if self._started_at else 0
+            self._remove_pidfile()
+            self._exited.set()
+        self._set_running(False)
+        if stopping or returncode == 0:
+            return
+        if returncode is None:
+            self._log('info', f"Adopted {self.name} (pid {pid}) exited with unknown status, not restarting")
+            return
+        self._log('warning', f"{self.name} exited unexpectedly (code {returncode})")
+        if not self.restart:
+            return
+        with self._lock:
+            if ran_for >= STABLE_RUN_SECONDS:
+                self._failures = 0
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** self._failures))
+            self._failures += 1
+            self._log('info', f"Restarting {self.name} in {delay}s")
+            self._restart_timer = threading.Timer(delay, self._restart_after_crash)
+            self._restart_timer.daemon = True
+            self._restart_timer.start()
+
+    def _restart_after_crash(self):
+        with self._lock:
+            self._restart_timer = None
+            if self._running or self._stopping:
+                return
+            try:
+                self._spawn()
+            except Exception as e:
+                self._log('error', f"Error restarting {self.name}: {e}")
+
+    def _cancel_restart(self):
+        if self._restart_timer is not None:
+            self._restart_timer.cancel()
+            self._restart_timer = None
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        with self._lock:
+            self._stopping = True
+            self._cancel_restart()
+            process = self._process
+            pid = self._pid
+            if not self._running or pid is None:
+                return False, f"{self.name} is not running"
+        try:
+            if process is not None:
+                process.terminate()
+            else:
+                os.kill(pid, signal.SIGTERM)
+            if not self._exited.wait(timeout):
+                self._log('warning', f"{self.name} didn't terminate gracefully, killing...")
+                if process is not None:
+                    process.kill()
+                else:
+                    os.kill(pid, signal.SIGKILL)
+                self._exited.wait(timeout)
+        except ProcessLookupError:
+            pass
+        except Exception as e:
+            self._log('error', f"Error stopping {self.name}: {e}")
+            return False, f"Error stopping {self.name}: {str(e)}"
+        with self._lock:
+            self._failures = 0
+        return True, f"{self.name} stopped successfully"
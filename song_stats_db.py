@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+import os, time, queue, hashlib, sqlite3, threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+DB_PATH = 'song_stats.db'
+READ_POOL_SIZE = 3
+WRITE_BATCH_SIZE = 50
+BUSY_TIMEOUT_MS = 5000
+BACKUP_INTERVAL = 1200
+BACKUP_KEEP = 3
+BACKUP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.05
+
+SCHEMA_VERSION = 4
+UNKNOWN_ARTIST = 'Unknown Artist'
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS tracks (
+        id INTEGER PRIMARY KEY,
+        track_key TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        artist_names TEXT NOT NULL,
+        play_count INTEGER NOT NULL DEFAULT 0,
+        last_played INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS artists (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        play_count INTEGER NOT NULL DEFAULT 0,
+        last_played INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS track_artists (
+        track_id INTEGER NOT NULL REFERENCES tracks(id) ON DELETE CASCADE,
+        artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (track_id, artist_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS plays (
+        id INTEGER PRIMARY KEY,
+        track_id INTEGER NOT NULL REFERENCES tracks(id) ON DELETE CASCADE,
+        played_at INTEGER NOT NULL,
+        listened_seconds INTEGER NOT NULL DEFAULT 0,
+        device TEXT,
+        play_uid TEXT,
+        completed INTEGER
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_track_plays (
+        day TEXT NOT NULL,
+        track_id INTEGER NOT NULL REFERENCES tracks(id) ON DELETE CASCADE,
+        play_count INTEGER NOT NULL DEFAULT 0,
+        listened_seconds INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, track_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS hourly_plays (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        play_count INTEGER NOT NULL DEFAULT 0,
+        listened_seconds INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, hour)
+    ) WITHOUT ROWID
+    '''
+]
+
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_tracks_top ON tracks(play_count DESC, last_played DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_artists_top ON artists(play_count DESC, last_played DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_track_artists_artist ON track_artists(artist_id)',
+    'CREATE INDEX IF NOT EXISTS idx_plays_track ON plays(track_id, played_at)',
+    'CREATE INDEX IF NOT EXISTS idx_plays_time ON plays(played_at, track_id, listened_seconds)',
+    'CREATE INDEX IF NOT EXISTS idx_daily_track ON daily_track_plays(track_id, day)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_plays_uid ON plays(play_uid)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS plays_counters AFTER INSERT ON plays BEGIN
+        UPDATE tracks SET play_count = play_count + 1, last_played = NEW.played_at
+        WHERE id = NEW.track_id;
+        UPDATE artists SET play_count = play_count + 1, last_played = NEW.played_at
+        WHERE id IN (SELECT artist_id FROM track_artists WHERE track_id = NEW.track_id);
+        INSERT INTO daily_track_plays (day, track_id, play_count, listened_seconds)
+        VALUES (date(NEW.played_at, 'unixepoch', 'localtime'), NEW.track_id, 1, NEW.listened_seconds)
+        ON CONFLICT(day, track_id) DO UPDATE SET
+            play_count = play_count + 1,
+            listened_seconds = listened_seconds + excluded.listened_seconds;
+        INSERT INTO hourly_plays (day, hour, play_count, listened_seconds)
+        VALUES (date(NEW.played_at, 'unixepoch', 'localtime'),
+                CAST(strftime('%H', NEW.played_at, 'unixepoch', 'localtime') AS INTEGER), 1, NEW.listened_seconds)
+        ON CONFLICT(day, hour) DO UPDATE SET
+            play_count = play_count + 1,
+            listened_seconds = listened_seconds + excluded.listened_seconds;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS plays_listened AFTER UPDATE OF listened_seconds ON plays BEGIN
+        UPDATE daily_track_plays SET listened_seconds = listened_seconds + NEW.listened_seconds - OLD.listened_seconds
+        WHERE day = date(NEW.played_at, 'unixepoch', 'localtime') AND track_id = NEW.track_id;
+        UPDATE hourly_plays SET listened_seconds = listened_seconds + NEW.listened_seconds - OLD.listened_seconds
+        WHERE day = date(NEW.played_at, 'unixepoch', 'localtime')
+          AND hour = CAST(strftime('%H', NEW.played_at, 'unixepoch', 'localtime') AS INTEGER);
+    END
+    '''
+]
+
+def track_key(title, artists):
+    full_track = f"{', '.join(artists)} -- {title}".strip()
+    return hashlib.md5(full_track.encode('utf-8')).hexdigest()[:16]
+
+def split_song_data(song_data):
+    if ' -- ' in song_data:
+        artist_part, title = song_data.split(' -- ', 1)
+    else:
+        artist_part, title = '', song_data
+    artists = [artist.strip() for artist in artist_part.split(',') if artist.strip()]
+    return title.strip(), artists or [UNKNOWN_ARTIST]
+
+def ensure_track(conn, title, artists):
+    artists = list(dict.fromkeys(artist for artist in artists if artist)) or [UNKNOWN_ARTIST]
+    key = track_key(title, artists)
+    row = conn.execute('SELECT id FROM tracks WHERE track_key = ?', (key,)).fetchone()
+    if row:
+        return row[0]
+    track_id = conn.execute(
+        'INSERT INTO tracks (track_key, title, artist_names) VALUES (?, ?, ?)',
+        (key, title, ', '.join(artists))
+    ).lastrowid
+    for position, name in enumerate(artists):
+        conn.execute('INSERT OR IGNORE INTO artists (name) VALUES (?)', (name,))
+        conn.execute(
+            'INSERT OR IGNORE INTO track_artists (track_id, artist_id, position) '
+            'SELECT ?, id, ? FROM artists WHERE name = ?',
+            (track_id, position, name)
+        )
+    return track_id
+
+def record_play(conn, title, artists, played_at=None, listened_seconds=0, device=None, play_uid=None):
+    track_id = ensure_track(conn, title, artists)
+    return conn.execute(
+        'INSERT OR IGNORE INTO plays (track_id, played_at, listened_seconds, device, play_uid) VALUES (?, ?, ?, ?, ?)',
+        (track_id, int(played_at or time.time()), int(listened_seconds), device or None, play_uid)
+    ).lastrowid
+
+def apply_play_event(conn, event):
+    event_type = event.get('type')
+    if event_type == 'threshold':
+        record_play(conn, event['title'], event.get('artists') or [], played_at=event.get('started_at'),
+                    listened_seconds=event.get('listened_seconds', 0), device=event.get('device'),
+                    play_uid=event['play_id'])
+    elif event_type in ('end', 'skip'):
+        listened_seconds = int(event.get('listened_seconds', 0))
+        conn.execute(
+            'UPDATE plays SET listened_seconds = MAX(listened_seconds, ?), completed = ? WHERE play_uid = ?',
+            (listened_seconds, 1 if event_type == 'end' else 0, event['play_id'])
+        )
+
+def top_tracks(conn, limit):
+    return conn.execute('''
+        SELECT artist_names || ' -- ' || title, play_count
+        FROM tracks
+        WHERE play_count > 0
+        ORDER BY play_count DESC, last_played DESC
+        LIMIT ?
+    ''', (limit,)).fetchall()
+
+def top_artists(conn, limit):
+    return conn.execute('''
+        SELECT name, play_count
+        FROM artists
+        WHERE play_count > 0
+        ORDER BY play_count DESC, last_played DESC
+        LIMIT ?
+    ''', (limit,)).fetchall()
+
+def totals(conn):
+    total_plays, unique_songs = conn.execute(
+        'SELECT COALESCE(SUM(play_count), 0), COUNT(*) FROM tracks WHERE play_count > 0'
+    ).fetchone()
+    unique_artists = conn.execute('SELECT COUNT(*) FROM artists WHERE play_count > 0').fetchone()[0]
+    return total_plays, unique_songs, unique_artists
+
+def _day(timestamp):
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+def top_tracks_between(conn, since, until, limit):
+    return conn.execute('''
+        SELECT t.artist_names || ' -- ' || t.title, SUM(d.play_count) AS plays
+        FROM daily_track_plays d JOIN tracks t ON t.id = d.track_id
+        WHERE d.day BETWEEN ? AND ?
+        GROUP BY d.track_id
+        ORDER BY plays DESC, MAX(d.day) DESC
+        LIMIT ?
+    ''', (_day(since), _day(until), limit)).fetchall()
+
+def top_artists_between(conn, since, until, limit):
+    return conn.execute('''
+        SELECT a.name, SUM(d.play_count) AS plays
+        FROM daily_track_plays d
+        JOIN track_artists ta ON ta.track_id = d.track_id
+        JOIN artists a ON a.id = ta.artist_id
+        WHERE d.day BETWEEN ? AND ?
+        GROUP BY ta.artist_id
+        ORDER BY plays DESC, MAX(d.day) DESC
+        LIMIT ?
+    ''', (_day(since), _day(until), limit)).fetchall()
+
+def totals_between(conn, since, until):
+    total_plays, unique_songs, listened_seconds = conn.execute('''
+        SELECT COALESCE(SUM(play_count), 0), COUNT(DISTINCT track_id), COALESCE(SUM(listened_seconds), 0)
+        FROM daily_track_plays
+        WHERE day BETWEEN ? AND ?
+    ''', (_day(since), _day(until))).fetchone()
+    unique_artists = conn.execute('''
+        SELECT COUNT(DISTINCT ta.artist_id)
+        FROM daily_track_plays d JOIN track_artists ta ON ta.track_id = d.track_id
+        WHERE d.day BETWEEN ? AND ?
+    ''', (_day(since), _day(until))).fetchone()[0]
+    return total_plays, unique_songs, unique_artists, listened_seconds
+
+def plays_by_hour(conn, since=None, until=None):
+    if since is None:
+        rows = conn.execute('SELECT hour, SUM(play_count) FROM hourly_plays GROUP BY hour').fetchall()
+    else:
+        rows = conn.execute(
+            'SELECT hour, SUM(play_count) FROM hourly_plays WHERE day BETWEEN ? AND ? GROUP BY hour',
+            (_day(since), _day(until))
+        ).fetchall()
+    counts = [0] * 24
+    for hour, count in rows:
+        counts[hour] = count
+    return counts
+
+def clear_stats(conn):
+    for table in ('hourly_plays', 'daily_track_plays', 'plays', 'track_artists', 'tracks', 'artists'):
+        conn.execute(f'DELETE FROM {table}')
+    conn.execute('DROP TABLE IF EXISTS song_plays_legacy')
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def migrate_legacy_song_plays(conn):
+    if not _table_exists(conn, 'song_plays'):
+        return 0
+    rows = conn.execute('''
+        SELECT song_data, play_count, COALESCE(CAST(strftime('%s', last_played) AS INTEGER), 0)
+        FROM song_plays
+        WHERE song_data IS NOT NULL AND play_count > 0
+    ''').fetchall()
+    for song_data, play_count, last_played in rows:
+        title, artists = split_song_data(song_data)
+        track_id = ensure_track(conn, title, artists)
+        conn.execute(
+            'UPDATE tracks SET play_count = play_count + ?, last_played = MAX(last_played, ?) WHERE id = ?',
+            (play_count, last_played, track_id)
+        )
+        conn.execute('''
+            UPDATE artists SET play_count = play_count + ?, last_played = MAX(last_played, ?)
+            WHERE id IN (SELECT artist_id FROM track_artists WHERE track_id = ?)
+        ''', (play_count, last_played, track_id))
+    conn.execute('DROP TABLE IF EXISTS song_plays_legacy')
+    conn.execute('ALTER TABLE song_plays RENAME TO song_plays_legacy')
+    return len(rows)
+
+def _add_columns(conn, table, columns):
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
+def migrate_play_log(conn):
+    _add_columns(conn, 'plays', [('listened_seconds', 'INTEGER NOT NULL DEFAULT 0'), ('device', 'TEXT')])
+    conn.execute('DROP TRIGGER IF EXISTS plays_counters')
+    conn.execute('DROP INDEX IF EXISTS idx_plays_track')
+    conn.execute('DELETE FROM daily_track_plays')
+    conn.execute('DELETE FROM hourly_plays')
+    conn.execute('''
+        INSERT INTO daily_track_plays (day, track_id, play_count, listened_seconds)
+        SELECT date(played_at, 'unixepoch', 'localtime'), track_id, COUNT(*), SUM(listened_seconds)
+        FROM plays GROUP BY 1, 2
+    ''')
+    conn.execute('''
+        INSERT INTO hourly_plays (day, hour, play_count, listened_seconds)
+        SELECT date(played_at, 'unixepoch', 'localtime'),
+               CAST(strftime('%H', played_at, 'unixepoch', 'localtime') AS INTEGER), COUNT(*), SUM(listened_seconds)
+        FROM plays GROUP BY 1, 2
+    ''')
+
+_STOP = object()
+
+class SongStatsDB:
+    def __init__(self, path=DB_PATH, read_pool_size=READ_POOL_SIZE, on_commit=None, logger=None):
+        self.path = path
+        self.read_pool_size = read_pool_size
+        self.on_commit = on_commit
+        self.logger = logger
+        self._writes = queue.Queue()
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._writer_thread = None
+        self._start_lock = threading.Lock()
+        self._backup_thread = None
+        self._backup_stop = threading.Event()
+        self._commits = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, isolation_level=None)
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        return conn
+
+    def start(self):
+        with self._start_lock:
+            if self._writer_thread is not None:
+                return
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('PRAGMA foreign_keys = ON')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                if version < 2:
+                    migrated = migrate_legacy_song_plays(conn)
+                    if migrated and self.logger is not None:
+                        self.logger.info(f"Migrated {migrated} songs to the normalised stats schema")
+                if version < 3:
+                    migrate_play_log(conn)
+                if version < 4:
+                    _add_columns(conn, 'plays', [('play_uid', 'TEXT'), ('completed', 'INTEGER')])
+                for statement in INDEXES:
+                    conn.execute(statement)
+                if version < SCHEMA_VERSION:
+                    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                conn.close()
+                raise
+            self._writer_thread = threading.Thread(target=self._writer_loop, args=(conn,), daemon=True)
+            self._writer_thread.start()
+
+    def submit(self, job, transaction=True):
+        self.start()
+        future = Future()
+        self._writes.put((job, transaction, future))
+        return future
+
+    def write(self, job, transaction=True, timeout=None):
+        return self.submit(job, transaction).result(timeout)
+
+    def _writer_loop(self, conn):
+        pending = None
+        while True:
+            if pending is not None:
+                item, pending = pending, None
+            else:
+                item = self._writes.get()
+            if item is _STOP:
+                break
+            if not item[1]:
+                self._run_standalone(conn, item)
+                continue
+            batch = [item]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP or not item[1]:
+                    pending = item
+                    break
+                batch.append(item)
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_standalone(self, conn, item):
+        job, _, future = item
+        try:
+            future.set_result(job(conn))
+        except Exception as e:
+            future.set_exception(e)
+            return
+        self._notify_commit()
+
+    def _run_batch(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for job, _, future in batch:
+                conn.execute('SAVEPOINT job')
+                try:
+                    results.append((future, job(conn), None))
+                    conn.execute('RELEASE job')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                    results.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            if self.logger is not None:
+                self.logger.error(f"Song stats write batch failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        self._notify_commit()
+
+    def _notify_commit(self):
+        self._commits += 1
+        if self.on_commit is not None:
+            try:
+                self.on_commit()
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"Song stats commit callback error: {e}")
+
+    @contextmanager
+    def read(self):
+        self.start()
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                can_open = self._reader_count < self.read_pool_size
+                if can_open:
+                    self._reader_count += 1
+            if can_open:
+                conn = self._connect()
+                conn.execute('PRAGMA query_only = 1')
+            else:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def _backup_path(self, index):
+        return f"{self.path}.backup.{index}"
+
+    def backup(self, keep=BACKUP_KEEP):
+        temp_path = f"{self._backup_path(1)}.tmp"
+        source = self._connect()
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target, pages=BACKUP_PAGES, sleep=BACKUP_STEP_SLEEP)
+            result = target.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+        if result != 'ok':
+            os.remove(temp_path)
+            raise sqlite3.DatabaseError(f"Backup failed integrity check: {result}")
+        for index in range(keep, 1, -1):
+            if os.path.exists(self._backup_path(index - 1)):
+                os.replace(self._backup_path(index - 1), self._backup_path(index))
+        os.replace(temp_path, self._backup_path(1))
+        return self._backup_path(1)
+
+    def _backup_due_in(self, interval):
+        try:
+            age = time.time() - os.path.getmtime(self._backup_path(1))
+        except OSError:
+            return 0
+        return max(0, interval - age)
+
+    def start_backups(self, interval=BACKUP_INTERVAL, keep=BACKUP_KEEP):
+        if self._backup_thread is not None:
+            return
+        self._backup_stop.clear()
+        self._backup_thread = threading.Thread(target=self._backup_loop, args=(interval, keep), daemon=True)
+        self._backup_thread.start()
+
+    def _backup_loop(self, interval, keep):
+        backed_up = None
+        while not self._backup_stop.wait(self._backup_due_in(interval)):
+            commits = self._commits
+            if commits == backed_up:
+                self._backup_stop.wait(interval)
+                continue
+            try:
+                path = self.backup(keep)
+                backed_up = commits
+                if self.logger is not None:
+                    self.logger.info(f"✅ Database backed up to {path}")
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.error(f"❌ Database backup failed: {e}")
+                self._backup_stop.wait(interval)
+
+    def close(self, timeout=5):
+        self._backup_stop.set()
+        self._backup_thread = None
+        with self._start_lock:
+            thread = self._writer_thread
+            self._writer_thread = None
+        if thread is not None:
+            self._writes.put(_STOP)
+            thread.join(timeout)
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._reader_lock:
+            self._reader_count = 0
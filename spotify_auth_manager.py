@@ -1,7 +1,36 @@
 #!/usr/bin/env python3
-import json, time, threading, os, toml, fcntl
+import json, time, threading, os, toml, fcntl, spotipy
+import http_client
+from urllib3.util.retry import Retry
+from spotipy.cache_handler import CacheFileHandler
 from spotipy.oauth2 import SpotifyOAuth
 
+REFRESH_AHEAD_SECONDS = 300
+READER_MARGIN_SECONDS = 60
+REFRESHER_RETRY_INTERVAL = 30
+REFRESHER_MAX_SLEEP = 60
+
+_spotify_client = None
+_spotify_client_token = None
+_spotify_client_lock = threading.Lock()
+_refresher_thread = None
+_refresher_lock_file = None
+
+def _atomic_write_json(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class AtomicCacheFileHandler(CacheFileHandler):
+    def save_token_to_cache(self, token_info):
+        try:
+            _atomic_write_json(self.cache_path, token_info)
+        except (IOError, OSError) as e:
+            print(f"⚠️ Couldn't write token to cache at {self.cache_path}: {e}")
+
 class SpotifyAuthManager:
     _instance = None
     _lock = threading.Lock()
@@ -15,20 +44,42 @@ class SpotifyAuthManager:
 
     def _initialize(self):
         self.config = self._load_config()
-        self.sp_oauth = SpotifyOAuth(
+        self.sp_oauth = self._create_oauth()
+        self.last_refresh = 0
+        self.refresh_lock = threading.Lock()
+        self.refresh_attempts = 0
+        self.max_refresh_attempts = 3
+        self._token_info = None
+        self._token_mtime = None
+        self._ensure_cache_directory()
+
+    def _create_oauth(self):
+        return SpotifyOAuth(
             client_id=self.config["api_keys"]["client_id"],
             client_secret=self.config["api_keys"]["client_secret"],
             redirect_uri=self.config["api_keys"]["redirect_uri"],
-            scope = "user-read-currently-playing user-modify-playback-state user-read-playback-state playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative user-read-private",
-            cache_path=".spotify_cache",
+            scope="user-read-currently-playing user-modify-playback-state user-read-playback-state playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative user-read-private",
+            cache_handler=AtomicCacheFileHandler(cache_path=".spotify_cache"),
             open_browser=False,
             show_dialog=False
         )
-        self.last_refresh = 0
-        self.refresh_lock = threading.Lock()
-        self.refresh_attempts = 0
-        self.max_refresh_attempts = 3
-        self._ensure_cache_directory()
+
+    def _cache_mtime(self):
+        try:
+            return os.stat('.spotify_cache').st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_cached_token(self):
+        try:
+            with open('.spotify_cache', 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remember_token(self, token_info):
+        self._token_info = token_info
+        self._token_mtime = self._cache_mtime()
 
     def _needs_refresh_soon(self, token_info, buffer_seconds=300):
         expires_at = token_info.get('expires_at', 0)
@@ -47,17 +98,25 @@ class SpotifyAuthManager:
             os.makedirs(cache_dir, exist_ok=True)
 
     def _reset_oauth(self):
-        self.sp_oauth = SpotifyOAuth(
-            client_id=self.config["api_keys"]["client_id"],
-            client_secret=self.config["api_keys"]["client_secret"],
-            redirect_uri=self.config["api_keys"]["redirect_uri"],
-            scope="user-read-currently-playing user-modify-playback-state user-read-playback-state playlist-modify-private playlist-modify-public playlist-read-private playlist-read-collaborative user-read-private",
-            cache_path=".spotify_cache",
-            open_browser=False,
-            show_dialog=False
-        )
+        self.sp_oauth = self._create_oauth()
 
     def get_valid_token(self, timeout=10):
+        token_info = self._token_info
+        if token_info and self._token_mtime == self._cache_mtime() and not self._needs_refresh_soon(token_info, READER_MARGIN_SECONDS):
+            return token_info['access_token']
+        mtime = self._cache_mtime()
+        token_info = self._read_cached_token()
+        if not token_info:
+            print("❌ No cached token found")
+            return None
+        if not self._needs_refresh_soon(token_info, READER_MARGIN_SECONDS):
+            self._token_info = token_info
+            self._token_mtime = mtime
+            return token_info['access_token']
+        token_info = self.refresh_token(timeout=timeout, buffer_seconds=READER_MARGIN_SECONDS)
+        return token_info['access_token'] if token_info else None
+
+    def refresh_token(self, timeout=10, buffer_seconds=REFRESH_AHEAD_SECONDS, force=False):
         start_time = time.time()
         with self.refresh_lock:
             if self.refresh_attempts >= self.max_refresh_attempts:
@@ -67,48 +126,49 @@ class SpotifyAuthManager:
                     return None
                 else:
                     self.refresh_attempts = 0
-            cache_lock_path = ".spotify_cache.lock"
-            lock_file = open(cache_lock_path, 'w')
+            lock_file = open(".spotify_cache.lock", 'w')
             try:
-                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                token_info = None
-                try:
-                    token_info = self.sp_oauth.get_cached_token()
-                except (AttributeError, TypeError):
-                    if os.path.exists('.spotify_cache'):
-                        try:
-                            with open('.spotify_cache', 'r') as f:
-                                token_info = json.load(f)
-                        except Exception:
-                            pass
+                while True:
+                    try:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.time() - start_time > timeout:
+                            print("⏱️ Timed out waiting for token refresh lock")
+                            token_info = self._read_cached_token()
+                            if token_info and not self.sp_oauth.is_token_expired(token_info):
+                                return token_info
+                            return None
+                        time.sleep(0.1)
+                token_info = self._read_cached_token()
                 if not token_info:
                     print("❌ No cached token found")
                     self.refresh_attempts += 1
                     return None
-                if time.time() - start_time > timeout:
-                    print("⏱️ Token fetch timeout")
+                if not force and not self._needs_refresh_soon(token_info, buffer_seconds):
+                    self._remember_token(token_info)
+                    return token_info
+                try:
+                    self._reset_oauth()
+                    token_info = self.sp_oauth.refresh_access_token(
+                        token_info['refresh_token']
+                    )
+                    self._backup_token(token_info)
+                    self._remember_token(token_info)
+                    self.last_refresh = time.time()
+                    self.refresh_attempts = 0
+                    print(f"✅ Token refreshed, expires at {token_info.get('expires_at', 'unknown')}")
+                    return token_info
+                except Exception as e:
+                    print(f"❌ Token refresh failed: {e}")
+                    self.refresh_attempts += 1
+                    self.last_refresh = time.time()
+                    if self.refresh_attempts == 1 and self._recover_from_backup():
+                        token_info = self._read_cached_token()
+                        if token_info and not self.sp_oauth.is_token_expired(token_info):
+                            self._remember_token(token_info)
+                            return token_info
                     return None
-                if self.sp_oauth.is_token_expired(token_info) or self._needs_refresh_soon(token_info):
-                    try:
-                        self._reset_oauth()
-                        token_info = self.sp_oauth.refresh_access_token(
-                            token_info['refresh_token']
-                        )
-                        self._backup_token(token_info)
-                        self.last_refresh = time.time()
-                        self.refresh_attempts = 0  # Reset on success
-                        print(f"✅ Token refreshed, expires at {token_info.get('expires_at', 'unknown')}")
-                    except Exception as e:
-                        print(f"❌ Token refresh failed: {e}")
-                        self.refresh_attempts += 1
-                        if self.refresh_attempts == 1:
-                            if self._recover_from_backup():
-                                return self.get_valid_token(timeout=max(3, timeout - (time.time() - start_time)))
-                        return None
-                return token_info['access_token']
-            except BlockingIOError:
-                print("🔒 Lock already held by another process")
-                return None
             finally:
                 try:
                     fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -127,8 +187,7 @@ class SpotifyAuthManager:
                 'backup_time': time.time()
             }
             try:
-                with open('.spotify_token_backup.json', 'w') as f:
-                    json.dump(backup, f)
+                _atomic_write_json('.spotify_token_backup.json', backup)
                 print("💾 Token backup created")
             except Exception as e:
                 print(f"⚠️ Backup failed: {e}")
@@ -157,8 +216,7 @@ class SpotifyAuthManager:
                 except Exception as e:
                     print(f"❌ Backup refresh failed: {e}")
                     return False
-            with open('.spotify_cache', 'w') as f:
-                json.dump(backup, f)
+            _atomic_write_json('.spotify_cache', backup)
             print("✅ Recovered token from backup")
             return True
         except Exception as e:
@@ -185,35 +243,94 @@ class SpotifyAuthManager:
             return "error", f"Token check error: {str(e)}"
 
     def force_refresh(self):
-        with self.refresh_lock:
-            token_info = self.sp_oauth.get_cached_token()
-            if token_info and 'refresh_token' in token_info:
-                print("🔧 Forcing token refresh...")
-                try:
-                    self._reset_oauth()
-                    token_info = self.sp_oauth.refresh_access_token(
-                        token_info['refresh_token']
-                    )
-                    self._backup_token(token_info)
-                    self.last_refresh = time.time()
-                    self.refresh_attempts = 0
-                    print("✅ Force refresh successful")
-                    return True
-                except Exception as e:
-                    print(f"❌ Force refresh failed: {e}")
-                    self.refresh_attempts += 1
-                    return False
-            return False
+        token_info = self._read_cached_token()
+        if token_info and 'refresh_token' in token_info:
+            print("🔧 Forcing token refresh...")
+            if self.refresh_token(force=True):
+                print("✅ Force refresh successful")
+                return True
+            print("❌ Force refresh failed")
+        return False
+
+def _acquire_refresher_role():
+    global _refresher_lock_file
+    if _refresher_lock_file is not None:
+        return True
+    lock_file = open(".spotify_refresher.lock", 'w')
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    _refresher_lock_file = lock_file
+    return True
+
+def _token_refresher_loop(stop_event):
+    announced = False
+    while not stop_event.is_set():
+        if not _acquire_refresher_role():
+            stop_event.wait(REFRESHER_RETRY_INTERVAL)
+            continue
+        if not announced:
+            print(f"🔑 Token refresher active in process {os.getpid()}")
+            announced = True
+        try:
+            auth_manager = SpotifyAuthManager()
+            token_info = auth_manager._read_cached_token()
+            if not token_info or 'refresh_token' not in token_info:
+                stop_event.wait(REFRESHER_RETRY_INTERVAL)
+                continue
+            wait = token_info.get('expires_at', 0) - REFRESH_AHEAD_SECONDS - time.time()
+            if wait <= 0:
+                if not auth_manager.refresh_token(timeout=30):
+                    stop_event.wait(REFRESHER_RETRY_INTERVAL)
+                continue
+            stop_event.wait(min(wait, REFRESHER_MAX_SLEEP))
+        except Exception as e:
+            print(f"❌ Token refresher error: {e}")
+            stop_event.wait(REFRESHER_RETRY_INTERVAL)
+
+def start_token_refresher(stop_event=None):
+    global _refresher_thread
+    with _spotify_client_lock:
+        if _refresher_thread is not None and _refresher_thread.is_alive():
+            return _refresher_thread
+        _refresher_thread = threading.Thread(
+            target=_token_refresher_loop,
+            args=(stop_event or threading.Event(),),
+            daemon=True
+        )
+        _refresher_thread.start()
+        return _refresher_thread
+
+def get_spotify_session():
+    retry = Retry(
+        total=3,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504)
+    )
+    return http_client.get_session('spotify', max_retries=retry, pool_maxsize=10)
 
 def get_spotify_client(timeout=10):
+    global _spotify_client, _spotify_client_token
     try:
         auth_manager = SpotifyAuthManager()
         token = auth_manager.get_valid_token(timeout=timeout)
         if not token:
             print("❌ Could not get valid token")
             return None
-        import spotipy
-        return spotipy.Spotify(auth=token)
+        session = get_spotify_session()
+        with _spotify_client_lock:
+            if _spotify_client is None or _spotify_client_token != token:
+                _spotify_client = spotipy.Spotify(auth=token, requests_session=session)
+                _spotify_client_token = token
+            return _spotify_client
     except Exception as e:
         print(f"❌ Error getting Spotify client: {e}")
         return None
@@ -228,4 +345,4 @@ if __name__ == "__main__":
         status, message = auth_manager.get_token_health()
         print(f"Token health: {status} - {message}")
     else:
-        print("❌ Failed to authenticate")
\ No newline at end of file
+        print("❌ Failed to authenticate")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import time, threading, collections
+from concurrent.futures import Future
+import track_resolver
+
+SEARCH_TYPES = 'track,playlist'
+SEARCH_LIMIT = 20
+CACHE_SIZE = 128
+CACHE_TTL = 300
+
+def normalise_query(query):
+    return ' '.join(str(query or '').casefold().split())
+
+def format_duration(duration_ms):
+    return f"{duration_ms // 60000}:{(duration_ms % 60000) // 1000:02d}"
+
+def format_track(item):
+    images = item['album']['images']
+    return {
+        'name': item['name'],
+        'artists': ', '.join([artist['name'] for artist in item['artists']]),
+        'album': item['album']['name'],
+        'duration': format_duration(item['duration_ms']),
+        'uri': item['uri'],
+        'image_url': images[-1]['url'] if images else None
+    }
+
+def format_playlist(item):
+    images = item.get('images')
+    return {
+        'name': item['name'],
+        'owner': item['owner']['display_name'],
+        'tracks_total': item['tracks']['total'],
+        'uri': item['uri'],
+        'image_url': images[0]['url'] if images else None
+    }
+
+def format_results(results):
+    results = results or {}
+    tracks = (results.get('tracks') or {}).get('items') or []
+    playlists = (results.get('playlists') or {}).get('items') or []
+    return {
+        'tracks': [format_track(item) for item in tracks if item],
+        'playlists': [format_playlist(item) for item in playlists if item]
+    }
+
+class SpotifySearchService:
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL, limit=SEARCH_LIMIT):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.limit = limit
+        self._cache = collections.OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def search(self, sp, query):
+        key = (normalise_query(query), SEARCH_TYPES)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._cache.move_to_end(key)
+                return entry[1]
+            self._cache.pop(key, None)
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            results = format_results(track_resolver.call_spotify(sp.search, q=query, type=SEARCH_TYPES, limit=self.limit))
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._cache[key] = (time.monotonic(), results)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self._in_flight.pop(key, None)
+        future.set_result(results)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+import os, json, time, queue, socket, struct, threading, collections, ctypes, ctypes.util
+
+SOCKET_PATH = ".neondisplay_state.sock"
+RECONNECT_INTERVAL = 5
+SEND_TIMEOUT = 1.0
+PROGRESS_STATE_NAME = ".neondisplay_track_progress.toml"
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_Q_OVERFLOW = 0x4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+_INOTIFY_EVENT = struct.Struct('iIII')
+_MISSING = object()
+SUBSCRIBER_QUEUE_SIZE = 32
+EVENT_OUTBOX_SIZE = 256
+
+def volatile_state_path(directory, name):
+    if directory and os.path.isdir(directory) and os.access(directory, os.W_OK):
+        return os.path.join(directory, name)
+    return name
+
+class StateBusServer:
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._snapshot = {}
+        self._versions = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._sock = None
+        self._stop = threading.Event()
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+        sock.listen(4)
+        self._sock = sock
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                if self._stop.is_set():
+                    return
+                time.sleep(0.5)
+                continue
+            threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        try:
+            with conn, conn.makefile('r', encoding='utf-8') as reader:
+                for line in reader:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(message, dict) or not message.get('topic'):
+                        continue
+                    if message.get('event'):
+                        self.emit(message['topic'], message.get('data'))
+                    else:
+                        self.publish(message['topic'], message.get('data'))
+        except OSError:
+            pass
+
+    def publish(self, topic, data):
+        with self._lock:
+            self._snapshot[topic] = data
+            version = self._versions.get(topic, 0) + 1
+            self._versions[topic] = version
+            subscribers = list(self._subscribers)
+        self._notify(subscribers, topic, data, version)
+
+    def emit(self, topic, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self._notify(subscribers, topic, data, None)
+
+    def _notify(self, subscribers, topic, data, version):
+        for callback in subscribers:
+            try:
+                callback(topic, data, version)
+            except Exception as e:
+                print(f"State bus subscriber error: {e}")
+
+    def clear(self, topic):
+        with self._lock:
+            self._snapshot.pop(topic, None)
+            self._versions[topic] = self._versions.get(topic, 0) + 1
+
+    def get(self, topic, default=None):
+        with self._lock:
+            return self._snapshot.get(topic, default)
+
+    def version(self, topic):
+        with self._lock:
+            return self._versions.get(topic, 0)
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+class StatePublisher:
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._sock = None
+        self._last = {}
+        self._outbox = collections.deque(maxlen=EVENT_OUTBOX_SIZE)
+        self._next_attempt = 0
+        self._lock = threading.Lock()
+
+    def publish(self, topic, data):
+        payload = (json.dumps({'topic': topic, 'data': data, 'ts': time.time()}, default=str) + '\n').encode('utf-8')
+        with self._lock:
+            self._last[topic] = payload
+            if self._sock is None:
+                return self._connect()
+            try:
+                self._sock.sendall(payload)
+                return True
+            except OSError:
+                self._close()
+                return False
+
+    def publish_event(self, topic, data):
+        payload = (json.dumps({'topic': topic, 'data': data, 'ts': time.time(), 'event': True}, default=str) + '\n').encode('utf-8')
+        with self._lock:
+            self._outbox.append(payload)
+            if self._sock is None:
+                return self._connect()
+            return self._flush_outbox()
+
+    def _flush_outbox(self):
+        while self._outbox:
+            try:
+                self._sock.sendall(self._outbox[0])
+            except OSError:
+                self._close()
+                return False
+            self._outbox.popleft()
+        return True
+
+    def _connect(self):
+        now = time.time()
+        if now < self._next_attempt:
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(SEND_TIMEOUT)
+        try:
+            sock.connect(self.path)
+            for payload in self._last.values():
+                sock.sendall(payload)
+        except OSError:
+            sock.close()
+            self._next_attempt = now + RECONNECT_INTERVAL
+            return False
+        self._sock = sock
+        return self._flush_outbox()
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        self._next_attempt = time.time() + RECONNECT_INTERVAL
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+class StateFileCache:
+    def __init__(self, loader):
+        self._loader = loader
+        self._entries = {}
+        self._generations = {}
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._libc = None
+        self._inotify_fd = None
+        self._init_inotify()
+
+    def _init_inotify(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self._libc = libc
+        self._inotify_fd = fd
+        threading.Thread(target=self._inotify_loop, daemon=True).start()
+
+    @property
+    def uses_inotify(self):
+        return self._inotify_fd is not None
+
+    def _watch_directory(self, directory):
+        if directory in self._watches.values():
+            return True
+        wd = self._libc.inotify_add_watch(self._inotify_fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._watches[wd] = directory
+        return True
+
+    def _inotify_loop(self):
+        while True:
+            try:
+                buffer = os.read(self._inotify_fd, 8192)
+            except OSError:
+                return
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(buffer):
+                wd, mask, _, length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+                name = buffer[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + length].rstrip(b'\0')
+                offset += _INOTIFY_EVENT.size + length
+                with self._lock:
+                    if mask & IN_Q_OVERFLOW:
+                        self._invalidate_all()
+                        continue
+                    directory = self._watches.get(wd)
+                    if directory is not None:
+                        self._invalidate(os.path.join(directory, os.fsdecode(name)))
+
+    def _invalidate(self, path):
+        self._entries.pop(path, None)
+        self._generations[path] = self._generations.get(path, 0) + 1
+
+    def _invalidate_all(self):
+        for path in list(self._entries):
+            self._invalidate(path)
+
+    def _signature(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def get(self, path, default=None):
+        path = os.path.abspath(path)
+        with self._lock:
+            watched = self.uses_inotify and self._watch_directory(os.path.dirname(path))
+            entry = self._entries.get(path)
+            generation = self._generations.get(path, 0)
+        signature = None if watched else self._signature(path)
+        if entry is not None and (watched or entry[0] == signature):
+            data = entry[1]
+            return default if data is _MISSING else data
+        if watched:
+            signature = self._signature(path)
+        data = _MISSING if signature is None else self._loader(path)
+        with self._lock:
+            if self._generations.get(path, 0) == generation:
+                self._entries[path] = (signature, data)
+        return default if data is _MISSING else data
+
+    def invalidate(self, path):
+        with self._lock:
+            self._invalidate(os.path.abspath(path))
+
+def format_sse(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+class BroadcastHub:
+    def __init__(self, max_subscribers=20):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+            for message in self._latest.values():
+                subscriber.put_nowait(message)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, message, key=None):
+        with self._lock:
+            if key is not None:
+                self._latest[key] = message
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
@@ -0,0 +1,29 @@
+const jobWaiters = {};
+function settleJob(job) {
+    const waiter = jobWaiters[job.id];
+    if (!waiter) return;
+    if (waiter.onProgress && job.message) waiter.onProgress(job);
+    if (job.status === 'succeeded' || job.status === 'failed' || job.status === 'cancelled') {
+        clearInterval(waiter.poll);
+        delete jobWaiters[job.id];
+        if (job.status === 'succeeded' && job.result) {
+            waiter.resolve(job.result);
+        } else {
+            waiter.resolve({ success: false, error: job.error || `Job ${job.status}` });
+        }
+    }
+}
+function pollJob(jobId) {
+    fetch(`/jobs/${jobId}`)
+        .then(response => response.json())
+        .then(job => { if (job.id) settleJob(job); })
+        .catch(error => console.error('Job poll error:', error));
+}
+function waitForJob(data, onProgress) {
+    if (!data || !data.job_id) return Promise.resolve(data);
+    return new Promise(resolve => {
+        const poll = setInterval(() => pollJob(data.job_id), 5000);
+        jobWaiters[data.job_id] = { resolve: resolve, onProgress: onProgress, poll: poll };
+        pollJob(data.job_id);
+    });
+}
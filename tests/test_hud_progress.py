@@ -0,0 +1,37 @@
+import importlib
+import pytest
+
+pytest.importorskip('evdev')
+
+
+@pytest.fixture
+def hud(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module('hud')
+    monkeypatch.setitem(module.track_state_cache, 'progress', None)
+    monkeypatch.setitem(module.track_state_cache, 'progress_written_at', 0)
+    return module
+
+
+def simulate(hud, positions, start=1000.0):
+    writes = []
+    for second, position in enumerate(positions):
+        now = start + second
+        fields = {'current_position': position, 'is_playing': True, 'timestamp': now}
+        if hud.progress_needs_write(fields, now):
+            hud.track_state_cache['progress'] = fields
+            hud.track_state_cache['progress_written_at'] = now
+            writes.append(second)
+    return writes
+
+
+def test_steady_playback_writes_on_interval(hud):
+    writes = simulate(hud, list(range(30)))
+    assert writes == list(range(0, 30, hud.PROGRESS_WRITE_INTERVAL))
+
+
+def test_seek_writes_immediately(hud):
+    positions = list(range(18)) + [120 + second for second in range(12)]
+    writes = simulate(hud, positions)
+    assert 18 in writes
+    assert writes == [0, 5, 10, 15, 18, 23, 28]
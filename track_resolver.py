@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import time, threading
+import lookup_cache
+from concurrent.futures import ThreadPoolExecutor
+from spotipy.exceptions import SpotifyException
+
+REQUESTS_PER_SECOND = 5
+BURST = 10
+MAX_WORKERS = 4
+MAX_ATTEMPTS = 3
+DEFAULT_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 60
+TRACK_ID_TTL = 30 * 86400
+TRACK_ID_NEGATIVE_TTL = 86400
+
+class RequestBudget:
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+spotify_budget = RequestBudget()
+
+def retry_after_seconds(error):
+    headers = getattr(error, 'headers', None) or {}
+    try:
+        seconds = float(headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+    except (TypeError, ValueError):
+        seconds = DEFAULT_RETRY_AFTER
+    return min(max(seconds, 1), MAX_RETRY_AFTER)
+
+def call_spotify(func, *args, budget=spotify_budget, **kwargs):
+    for attempt in range(MAX_ATTEMPTS):
+        budget.acquire()
+        try:
+            return func(*args, **kwargs)
+        except SpotifyException as e:
+            if e.http_status != 429 or attempt == MAX_ATTEMPTS - 1:
+                raise
+            budget.pause(retry_after_seconds(e))
+
+def search_track_id(sp, name, artist, budget=spotify_budget):
+    def fetch():
+        result = call_spotify(sp.search, q=f"track:{name} artist:{artist}", type='track', limit=1, budget=budget)
+        items = result['tracks']['items']
+        return items[0]['id'] if items else None
+    return lookup_cache.cached('spotify_track_id', lookup_cache.make_key(name, artist), fetch,
+                               TRACK_ID_TTL, TRACK_ID_NEGATIVE_TTL)
+
+def resolve_tracks(sp, candidates, budget=spotify_budget, max_workers=MAX_WORKERS, logger=None):
+    def resolve(candidate):
+        name, artist = candidate
+        try:
+            return search_track_id(sp, name, artist, budget)
+        except Exception as e:
+            if logger is not None:
+                logger.error(f"  Error searching for {name} by {artist}: {e}")
+            return None
+    if not candidates:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(candidates))) as executor:
+        return list(executor.map(resolve, candidates))